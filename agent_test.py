@@ -7,18 +7,47 @@ interface, but cannot be automatically assessed for correctness.
 STUDENTS SHOULD NOT NEED TO MODIFY THIS CODE.  IT WOULD BE BEST TO TREAT THIS
 FILE AS A BLACK BOX FOR TESTING.
 """
+import json
 import random
 import unittest
 import timeit
 import sys
-
+import os
+import pickle
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import benchmark
 import isolation
 import game_agent
+import mcts
+import sample_players
+import endgame
+import evaluation_cache
+import move_ordering
+import opening_book
+import pondering
+import profiling
+import time_management
+import tournament
+import transposition
+
+try:
+    import batch_eval
+    import batch_sim
+except ImportError:  # NumPy is not installed
+    batch_eval = batch_sim = None
 
 from collections import Counter
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from copy import deepcopy
 from copy import copy
 from functools import wraps
+from io import StringIO
 from queue import Queue
 from threading import Thread
 from multiprocessing import TimeoutError
@@ -213,6 +242,35 @@ class CounterBoard(isolation.Board):
         return sum(self.counter.values()), len(self.visited)
 
 
+class CompactCounterBoard(isolation.CompactBoard):
+    """Counterpart of `CounterBoard` for the compact board, subclassed in the
+    same way.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(CompactCounterBoard, self).__init__(*args, **kwargs)
+        self.counter = Counter()
+        self.visited = set()
+        self.root = None
+
+    def copy(self):
+        new_board = CompactCounterBoard(self.__player_1__, self.__player_2__,
+                                        width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__last_player_move__ = copy(self.__last_player_move__)
+        new_board.__player_symbols__ = copy(self.__player_symbols__)
+        new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.counter = self.counter
+        new_board.visited = self.visited
+        new_board.root = self.root
+        return new_board
+
+    forecast_move = CounterBoard.forecast_move
+    counts = CounterBoard.counts
+
+
 class Project1Test(unittest.TestCase):
 
     def initAUT(self, depth, eval_fn, iterative=False,
@@ -536,5 +594,1192 @@ class Project1Test(unittest.TestCase):
                 legal_moves, chosen_move))
 
 
+class BitBoardTest(unittest.TestCase):
+
+    def assertSameState(self, board, bitboard):
+        """Check that both backends agree on every query of the public API."""
+        for player in (board.active_player, board.inactive_player):
+            self.assertEqual(board.get_legal_moves(player), bitboard.get_legal_moves(player))
+            self.assertEqual(board.get_player_location(player), bitboard.get_player_location(player))
+            self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+            self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+        self.assertEqual(board.get_blank_spaces(), bitboard.get_blank_spaces())
+        self.assertEqual(board.count_blank_spaces(), bitboard.count_blank_spaces())
+        self.assertEqual(board.to_string(), bitboard.to_string())
+
+    @timeout(5)
+    def test_random_games(self):
+        """ Test that BitBoard matches Board along random games """
+        rng = random.Random(0)
+        for w, h in [(7, 7), (5, 8)]:
+            for _ in range(10):
+                board = isolation.Board('p1', 'p2', w, h)
+                bitboard = isolation.BitBoard('p1', 'p2', w, h)
+                self.assertSameState(board, bitboard)
+                while board.get_legal_moves():
+                    move = rng.choice(board.get_legal_moves())
+                    self.assertEqual(board.forecast_move(move).to_string(),
+                                     bitboard.forecast_move(move).to_string())
+                    board.apply_move(move)
+                    bitboard = bitboard.copy()
+                    bitboard.apply_move(move)
+                    self.assertSameState(board, bitboard)
+
+
+class CompactBoardTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_random_games(self):
+        """ Test that CompactBoard matches Board along random games """
+        rng = random.Random(4)
+        for w, h in [(7, 7), (5, 8)]:
+            for _ in range(10):
+                board = isolation.Board('p1', 'p2', w, h)
+                compact = isolation.CompactBoard('p1', 'p2', w, h)
+                moves = []
+                while True:
+                    BitBoardTest.assertSameState(self, board, compact.copy())
+                    self.assertEqual(board.get_hash(), compact.get_hash())
+                    for player in ('p1', 'p2'):
+                        self.assertEqual(board.count_legal_moves(player), compact.count_legal_moves(player))
+                    if not board.get_legal_moves():
+                        break
+                    moves.append(rng.choice(board.get_legal_moves()))
+                    board.apply_move(moves[-1])
+                    compact.push(moves[-1])
+                while moves:
+                    self.assertEqual(moves.pop(), compact.pop())
+                self.assertEqual(compact.to_string(), isolation.CompactBoard('p1', 'p2', w, h).to_string())
+                self.assertEqual(compact.get_hash(), 0)
+
+    @timeout(10)
+    def test_counter_subclass(self):
+        """ Test that CompactBoard supports the CounterBoard subclassing pattern """
+        self.assertFalse(hasattr(isolation.CompactBoard('p1', 'p2'), '__dict__'))
+        results = []
+        for board_cls in (CounterBoard, CompactCounterBoard):
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, 'alphabeta')
+            agentUT.time_left = lambda: 1e3
+            board = board_cls(agentUT, 'null_agent')
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            results.append((agentUT.alphabeta(board, 3), board.counts))
+        self.assertEqual(results[0], results[1])
+
+
+class InPlaceSearchTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_push_pop(self):
+        """ Test that Board.pop reverts Board.push exactly """
+        rng = random.Random(1)
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls('p1', 'p2')
+            states = []
+            while board.get_legal_moves():
+                states.append((board.to_string(), board.active_player, board.move_count,
+                               board.get_player_location('p1'), board.get_player_location('p2')))
+                board.push(rng.choice(board.get_legal_moves()))
+            while states:
+                board.pop()
+                self.assertEqual(states.pop(), (board.to_string(), board.active_player, board.move_count,
+                                                board.get_player_location('p1'),
+                                                board.get_player_location('p2')))
+
+    @timeout(10)
+    def test_inplace_search(self):
+        """ Test that in-place search matches forecast_move search """
+        for method in ("minimax", "alphabeta"):
+            for board_cls in (isolation.Board, isolation.BitBoard):
+                agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, method)
+                inplaceUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, method,
+                                                    inplace=True)
+                agentUT.time_left = inplaceUT.time_left = lambda: 1e3
+                board = board_cls(agentUT, 'null_agent')
+                board.apply_move((2, 3))
+                board.apply_move((0, 0))
+                expected = getattr(agentUT, method)(board, 3)
+                inplace_board = board_cls(inplaceUT, 'null_agent')
+                inplace_board.apply_move((2, 3))
+                inplace_board.apply_move((0, 0))
+                before = inplace_board.to_string()
+                self.assertEqual(expected, getattr(inplaceUT, method)(inplace_board, 3))
+                self.assertEqual(before, inplace_board.to_string())
+                self.assertEqual(inplace_board.move_count, 2)
+
+
+class FailingPlayer:
+    """Player raising an exception when asked for a move (defined at the top
+    level so that it can be sent to the workers of a tournament).
+    """
+
+    def get_move(self, game, legal_moves, time_left):
+        raise ValueError("failing player")
+
+
+class TournamentTest(unittest.TestCase):
+
+    def agents(self):
+        return [tournament.Agent(sample_players.RandomPlayer(), "Random"),
+                tournament.Agent(game_agent.CustomPlayer(2, sample_players.improved_score, False, 'alphabeta'),
+                                 "AB_Improved")]
+
+    def play_round(self, agents, executor=None):
+        """ Return the win ratio and the printed results of a seeded round """
+        output = StringIO()
+        with redirect_stdout(output):
+            win_ratio = tournament.play_round(agents, 2, executor=executor, seed=5)
+        return win_ratio, output.getvalue()
+
+    def test_parallel_round(self):
+        """ Test that a seeded round has the same tallies in worker processes """
+        serial = self.play_round(self.agents())
+        executor = ProcessPoolExecutor(max_workers=2)
+        try:
+            parallel = self.play_round(self.agents(), executor)
+        finally:
+            executor.shutdown()
+        self.assertEqual(serial, parallel)
+        self.assertIn("Result:", serial[1])
+
+    def test_openings(self):
+        """ Test that seeded openings are legal, reproducible and saved and loaded unchanged """
+        openings = tournament.make_openings(5, seed=3)
+        self.assertEqual(openings, tournament.make_openings(5, seed=3))
+        self.assertNotEqual(openings, tournament.make_openings(5, seed=4))
+        for opening in openings:
+            board = isolation.Board('p1', 'p2')
+            for move in opening:
+                self.assertIn(move, board.get_legal_moves())
+                board.apply_move(move)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'openings.json')
+            tournament.save_openings(openings, path)
+            self.assertEqual(tournament.load_openings(path), openings)
+
+    def test_derive_seed(self):
+        """ Test that the seeds of the matches do not depend on the process deriving them """
+        seeds = [tournament.derive_seed(5, 0, 1, 2), tournament.derive_seed(5, 0, 1, 3)]
+        self.assertNotEqual(seeds[0], seeds[1])
+        for hash_seed in ('1', '2'):
+            output = subprocess.run([sys.executable, '-c', 'import tournament; '
+                                     'print(tournament.derive_seed(5, 0, 1, 2), tournament.derive_seed(5, 0, 1, 3))'],
+                                    env=dict(os.environ, PYTHONHASHSEED=hash_seed),
+                                    cwd=os.path.dirname(os.path.abspath(tournament.__file__)),
+                                    stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+            self.assertEqual(output.split(), [str(seed) for seed in seeds])
+
+    def test_save_openings_without_seed(self):
+        """ Test that saving openings without generating or loading them is an error """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'openings.json')
+            process = subprocess.run([sys.executable, tournament.__file__, '--save-openings', path],
+                                     stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            self.assertEqual(process.returncode, 2)
+            self.assertIn('--save-openings requires --seed', process.stderr)
+            self.assertFalse(os.path.exists(path))
+
+    def test_failing_agent(self):
+        """ Test that an agent failing in a worker process is reported """
+        agents = [tournament.Agent(FailingPlayer(), "Failing")] + self.agents()[1:]
+        executor = ProcessPoolExecutor(max_workers=2)
+        try:
+            with self.assertRaises(RuntimeError) as context:
+                self.play_round(agents, executor)
+        finally:
+            executor.shutdown()
+        self.assertIsInstance(context.exception.__cause__, ValueError)
+        self.assertIn("Failing", str(context.exception))
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_benchmark(self):
+        """ Test that the benchmark writes a record per method, heuristic and depth """
+        with tempfile.TemporaryDirectory() as directory:
+            positions, output = os.path.join(directory, 'positions.json'), os.path.join(directory, 'report.json')
+            subprocess.run([sys.executable, benchmark.__file__, '--depth', '2', '--num-positions', '1',
+                            '--methods', 'minimax', 'alphabeta', '--heuristics', 'improved',
+                            '--save-positions', positions, '--output', output], check=True)
+            with open(output) as f:
+                report = json.load(f)
+            self.assertEqual(len(benchmark.load_positions(positions)), 1)
+
+        self.assertEqual((report['board'], report['num_positions']), ('list', 1))
+        self.assertEqual(sorted(report['board_costs']), ['copy_bytes', 'copy_us', 'forecast_move_us'])
+        self.assertEqual([(record['method'], record['depth']) for record in report['results']],
+                         [('minimax', 1), ('minimax', 2), ('alphabeta', 1), ('alphabeta', 2)])
+        for record in report['results']:
+            self.assertEqual(sorted(record), ['batch', 'depth', 'effective_branching_factor', 'heuristic',
+                                              'method', 'nodes', 'nodes_per_second', 'seconds',
+                                              'time_to_depth'])
+            self.assertGreater(record['nodes'], 0)
+            self.assertEqual(record['effective_branching_factor'] is None, record['depth'] == 1)
+        minimax, alphabeta = report['results'][1], report['results'][3]
+        self.assertLessEqual(alphabeta['nodes'], minimax['nodes'])
+        self.assertGreaterEqual(minimax['time_to_depth'], minimax['seconds'])
+
+    def test_board_costs(self):
+        """ Test that copying a board allocates less than building a new one, and that regressions are reported """
+        positions = benchmark.make_positions(2, seed=1)
+        costs = benchmark.board_costs(isolation.Board, positions, number=50)
+        self.assertEqual(sorted(costs), ['copy_bytes', 'copy_us', 'forecast_move_us'])
+        new_boards = []
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            for _ in range(50):
+                new_boards.append(isolation.Board('player1', 'player2'))
+            init_bytes = (tracemalloc.get_traced_memory()[0] - start) / 50
+        finally:
+            tracemalloc.stop()
+        self.assertLess(costs['copy_bytes'], init_bytes)
+
+        record = {'method': 'alphabeta', 'heuristic': 'improved', 'batch': False, 'depth': 2, 'nodes': 100}
+        report = {'board_costs': costs, 'results': [record]}
+        self.assertEqual(benchmark.compare(report, report), [])
+        slower = dict(costs, copy_us=costs['copy_us'] * 3)
+        regressions = benchmark.compare({'board_costs': slower, 'results': [dict(record, nodes=101)]}, report)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('copy_us'))
+
+
+class LegalMoveCountTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_count_legal_moves(self):
+        """ Test that the legal move and blank space counts are maintained along games """
+        rng = random.Random(3)
+        for _ in range(5):
+            boards = [isolation.Board('p1', 'p2'), isolation.BitBoard('p1', 'p2'), CounterBoard('p1', 'p2')]
+            counts = []
+            while boards[0].get_legal_moves():
+                for board in boards:
+                    for player in ('p1', 'p2'):
+                        self.assertEqual(board.count_legal_moves(player), len(board.get_legal_moves(player)))
+                    self.assertEqual(board.count_blank_spaces(), len(board.get_blank_spaces()))
+                counts.append(boards[0].count_legal_moves())
+                move = rng.choice(boards[0].get_legal_moves())
+                boards[0].push(move)
+                boards[1].push(move)
+                boards[2] = boards[2].forecast_move(move)
+            while counts:
+                boards[0].pop()
+                boards[1].pop()
+                self.assertEqual(counts[-1], boards[0].count_legal_moves())
+                self.assertEqual(counts.pop(), boards[1].count_legal_moves())
+                self.assertEqual(boards[0].get_blank_spaces(), boards[1].get_blank_spaces())
+
+    def test_copy(self):
+        """ Test that a copy and its original board are updated independently """
+        board = isolation.Board('p1', 'p2')
+        for move in [(2, 3), (0, 0), (4, 4)]:
+            board.apply_move(move)
+        counts = (board.count_legal_moves('p1'), board.count_legal_moves('p2'), board.count_blank_spaces())
+        hash_value = board.get_hash()
+        new_board = board.copy()
+        self.assertEqual(new_board.get_hash(), hash_value)
+        new_board.apply_move((2, 1))
+        new_board.push((0, 5))
+        self.assertEqual((board.count_legal_moves('p1'), board.count_legal_moves('p2'),
+                          board.count_blank_spaces()), counts)
+        self.assertEqual(board.get_hash(), hash_value)
+        for player in ('p1', 'p2'):
+            self.assertEqual(new_board.count_legal_moves(player), len(new_board.get_legal_moves(player)))
+        self.assertEqual(new_board.count_blank_spaces(), len(board.get_blank_spaces()) - 2)
+
+
+class TranspositionTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_incremental_hash(self):
+        """ Test that Board.get_hash is maintained along games """
+        rng = random.Random(2)
+        for _ in range(5):
+            board = isolation.Board('p1', 'p2')
+            bitboard = isolation.BitBoard('p1', 'p2')
+            counter_board = CounterBoard('p1', 'p2')
+            moves = []
+            hashes = []
+            while board.get_legal_moves():
+                hashes.append(board.get_hash())
+                move = rng.choice(board.get_legal_moves())
+                moves.append(move)
+                board.push(move)
+                bitboard.push(move)
+                counter_board = counter_board.forecast_move(move)
+                replayed = isolation.Board('p1', 'p2')
+                for replayed_move in moves:
+                    replayed.apply_move(replayed_move)
+                self.assertEqual(board.get_hash(), replayed.get_hash())
+                self.assertEqual(board.get_hash(), bitboard.get_hash())
+                self.assertEqual(board.get_hash(), counter_board.get_hash())
+            self.assertEqual(len(set(hashes)), len(hashes))
+            while hashes:
+                board.pop()
+                self.assertEqual(hashes.pop(), board.get_hash())
+
+    def test_replacement(self):
+        """ Test the replacement strategies of the transposition table """
+        for replacement, kept in [('always', 3), ('depth', 1), ('age', 1)]:
+            table = transposition.TranspositionTable(4, replacement)
+            table.store(1, 5, transposition.EXACT, 1., (0, 0))
+            table.store(5, 2, transposition.EXACT, 3., (0, 0))
+            self.assertEqual(table.slots[1].score, kept)
+            self.assertIsNone(table.probe(1 if kept == 3 else 5))
+        table.new_search()
+        table.store(5, 2, transposition.EXACT, 3., (0, 0))
+        self.assertEqual(table.probe(5).score, 3)
+
+
+    @timeout(5)
+    def test_canonical_form(self):
+        """ Test that symmetric states share their canonical form """
+        rng = random.Random(8)
+        for w, h in [(7, 7), (5, 8)]:
+            images, _ = isolation.symmetry_tables(w, h)
+            self.assertEqual(len(images), 8 if w == h else 4)
+            for _ in range(10):
+                board = isolation.Board('p1', 'p2', w, h)
+                moves = []
+                for _ in range(rng.randrange(8)):
+                    moves.append(rng.choice(board.get_legal_moves()))
+                    board.apply_move(moves[-1])
+                canonical_hash, symmetry = board.get_canonical_form()
+                for move in board.get_l_shaped_moves() + board.get_blank_spaces():
+                    self.assertEqual(move, board.from_canonical(board.to_canonical(move, symmetry), symmetry))
+                for board_cls in (isolation.Board, isolation.BitBoard, isolation.CompactBoard):
+                    for image in range(len(images)):
+                        symmetric = board_cls('p1', 'p2', w, h)
+                        for move in moves:
+                            symmetric.apply_move(divmod(images[image][move[0] * w + move[1]], w))
+                        self.assertEqual(canonical_hash, symmetric.get_canonical_hash())
+                        if image == symmetry:
+                            self.assertEqual(canonical_hash, symmetric.get_hash())
+
+    @timeout(10)
+    def test_tt_symmetry(self):
+        """ Test that a table keyed by canonical forms keeps search results exact """
+        rng = random.Random(9)
+        for _ in range(5):
+            agentUT = game_agent.CustomPlayer(4, game_agent.custom_score, False, 'alphabeta')
+            symmetricUT = game_agent.CustomPlayer(4, game_agent.custom_score, False, 'alphabeta',
+                                                  tt_size=2**12, tt_symmetry=True)
+            agentUT.time_left = symmetricUT.time_left = lambda: 1e3
+            board = isolation.Board(agentUT, 'p2')
+            symmetric = isolation.Board(symmetricUT, 'p2')
+            for _ in range(2 * rng.randrange(1, 5)):
+                move = rng.choice(board.get_legal_moves())
+                board.apply_move(move)
+                symmetric.apply_move(move)
+            score, _ = agentUT.alphabeta(board, 4)
+            symmetric_score, move = symmetricUT.alphabeta(symmetric, 4)
+            self.assertEqual(score, symmetric_score)
+            self.assertIn(move, symmetric.get_legal_moves())
+            self.assertGreater(len(symmetricUT.tt), 0)
+
+
+class EvaluationCacheTest(unittest.TestCase):
+
+    @timeout(5)
+    def test_lru(self):
+        """ Test the hits and the LRU evictions of EvaluationCache """
+        calls = Counter()
+
+        def score_fn(game, player):
+            calls[game.get_hash()] += 1
+            return float(game.count_legal_moves(player))
+
+        cache = evaluation_cache.EvaluationCache(score_fn, capacity=2)
+        board = isolation.Board('p1', 'p2')
+        board.apply_move((3, 3))
+        states = [board.forecast_move(move) for move in board.get_legal_moves()[:3]]
+        for state in states[:2] + states[:1] + states[2:] + states[:1] + states[1:2]:
+            self.assertEqual(cache(state, 'p1'), score_fn(state, 'p1'))
+        # states[1] was the least recently used result when states[2] was added.
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 4, 2))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.hit_rate, 2 / 6)
+        cache(states[0], 'p2')
+        self.assertEqual(cache.misses, 5)
+
+    @timeout(10)
+    def test_cached_search(self):
+        """ Test that searching with an evaluation cache gives the same results """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, 'alphabeta')
+        cachedUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, 'alphabeta', eval_cache_size=2**12)
+        agentUT.time_left = cachedUT.time_left = lambda: 1e3
+        for depth in (1, 2, 3):
+            board = isolation.Board(agentUT, 'p2')
+            cached = isolation.Board(cachedUT, 'p2')
+            for move in [(2, 3), (0, 0)]:
+                board.apply_move(move)
+                cached.apply_move(move)
+            self.assertEqual(agentUT.alphabeta(board, depth), cachedUT.alphabeta(cached, depth))
+        # Searching again (e.g., in the next iteration of iterative deepening, or two plies
+        # deeper at the next move) reuses the results.
+        misses = cachedUT.score.misses
+        self.assertEqual(agentUT.alphabeta(board, 3), cachedUT.alphabeta(cached, 3))
+        self.assertEqual(cachedUT.score.misses, misses)
+        self.assertGreater(cachedUT.score.hits, 0)
+
+
+@unittest.skipIf(batch_eval is None, "NumPy is not installed")
+class BatchEvalTest(unittest.TestCase):
+
+    @timeout(10)
+    def test_batch_scores(self):
+        """ Test that the batch heuristics match the heuristics child by child """
+        rng = random.Random(10)
+        heuristics = [(sample_players.improved_score, batch_eval.batch_improved_score),
+                      (game_agent.custom_score, batch_eval.batch_custom_score)]
+        for _ in range(100):
+            board = isolation.Board('p1', 'p2')
+            for _ in range(rng.randrange(2, 45)):
+                if not board.get_legal_moves():
+                    break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            moves = board.get_legal_moves()
+            if not moves:
+                continue
+            for player in ('p1', 'p2'):
+                for score_fn, batch_score_fn in heuristics:
+                    self.assertEqual([score_fn(board.forecast_move(move), player) for move in moves],
+                                     batch_score_fn(board, moves, player))
+
+    @timeout(10)
+    def test_batch_search(self):
+        """ Test that searching with batch evaluation at the frontier gives the same results """
+        for method in ("minimax", "alphabeta", "pvs"):
+            for depth in (1, 2, 3):
+                agentUT = game_agent.CustomPlayer(depth, game_agent.custom_score, False, method)
+                batchUT = game_agent.CustomPlayer(depth, game_agent.custom_score, False, method,
+                                                  batch_score_fn=batch_eval.batch_custom_score)
+                agentUT.time_left = batchUT.time_left = lambda: 1e3
+                board = isolation.Board(agentUT, 'p2')
+                batch_board = isolation.Board(batchUT, 'p2')
+                for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                    board.apply_move(move)
+                    batch_board.apply_move(move)
+                self.assertEqual(getattr(agentUT, method)(board, depth),
+                                 getattr(batchUT, method)(batch_board, depth))
+
+
+@unittest.skipIf(batch_sim is None, "NumPy is not installed")
+class BatchSimulationTest(unittest.TestCase):
+
+    @timeout(10)
+    def test_simulate(self):
+        """ Test that simulated games replay legally on Board with the same winners """
+        openings = [[(3, 3), (0, 0)], [(1, 2), (5, 6)]]
+        for policies in [('random', 'random'), ('greedy', 'random'), ('random', 'greedy')]:
+            for start in (None, openings):
+                simulation = batch_sim.simulate(50, policies, seed=3, openings=start)
+                for game in range(50):
+                    board = isolation.Board('p1', 'p2')
+                    length = simulation.lengths[game]
+                    for ply, move in enumerate(map(tuple, simulation.moves[game, :length])):
+                        legal_moves = board.get_legal_moves()
+                        self.assertIn(move, legal_moves)
+                        if start is not None and ply < 2:
+                            self.assertEqual(move, start[game % 2][ply])
+                        elif policies[ply % 2] == 'greedy':
+                            # The mover maximizes its open moves after the move.
+                            scores = [sample_players.open_move_score(board.forecast_move(m), board.active_player)
+                                      for m in legal_moves]
+                            self.assertEqual(sample_players.open_move_score(board.forecast_move(move),
+                                                                            board.active_player), max(scores))
+                        board.apply_move(move)
+                    self.assertTrue((simulation.moves[game, length:] == -1).all())
+                    self.assertEqual(board.get_legal_moves(), [])
+                    self.assertTrue(board.is_winner(('p1', 'p2')[simulation.winners[game]]))
+
+    def test_seed(self):
+        """ Test that simulations with the same seed are identical """
+        first = batch_sim.simulate(20, ('greedy', 'random'), seed=7)
+        second = batch_sim.simulate(20, ('greedy', 'random'), seed=7)
+        for a, b in zip(first, second):
+            self.assertTrue((a == b).all())
+
+    def test_full_board(self):
+        """ Test that the winner of a game filling the board is the last player to move """
+        for policies in [('random', 'random'), ('greedy', 'greedy')]:
+            simulation = batch_sim.simulate(10, policies, width=2, height=1, seed=1)
+            self.assertTrue((simulation.lengths == 2).all())
+            self.assertTrue((simulation.winners == 1).all())
+        board = isolation.Board('p1', 'p2', width=2, height=1)
+        for move in map(tuple, simulation.moves[0]):
+            board.apply_move(move)
+        self.assertTrue(board.is_winner('p2'))
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    @timeout(20)
+    def test_ordering(self):
+        """ Test that move ordering preserves scores and prunes more """
+        rng = random.Random(5)
+        counts = {}
+        expected_scores = {}
+        for _ in range(5):
+            opening = [rng.choice([(2, 2), (2, 3), (3, 3)]), rng.choice([(0, 0), (6, 5), (1, 6)])]
+            for ordering in (None, ('killers', 'history', 'mobility'), move_ordering.COMPONENTS):
+                agentUT = game_agent.CustomPlayer(5, game_agent.custom_score, False, "alphabeta",
+                                                  tt_size=4096, ordering=ordering)
+                agentUT.time_left = lambda: 1e3
+                board = CounterBoard(agentUT, 'null_agent')
+                for move in opening:
+                    board.apply_move(move)
+                scores = []
+                for depth in range(1, 6):
+                    score, agentUT.root_move = agentUT.alphabeta(board, depth)
+                    scores.append(score)
+                counts[ordering] = counts.get(ordering, 0) + board.counts[0]
+                self.assertEqual(scores, expected_scores.setdefault(tuple(opening), scores))
+        self.assertLess(counts[move_ordering.COMPONENTS], counts[None])
+
+
+class PVSTest(unittest.TestCase):
+
+    @timeout(20)
+    def test_pvs(self):
+        """ Test that PVS returns the alpha-beta moves and expands fewer nodes """
+        rng = random.Random(7)
+        counts = Counter()
+        for _ in range(5):
+            opening = [rng.choice([(2, 2), (2, 3), (3, 3)]), rng.choice([(0, 0), (6, 5), (1, 6)])]
+            results = {}
+            for method in ("alphabeta", "pvs"):
+                agentUT = game_agent.CustomPlayer(5, game_agent.custom_score, False, method,
+                                                  ordering=move_ordering.COMPONENTS)
+                agentUT.time_left = lambda: 1e3
+                board = CounterBoard(agentUT, 'null_agent')
+                for move in opening:
+                    board.apply_move(move)
+                results[method] = []
+                for depth in range(1, 6):
+                    score, agentUT.root_move = getattr(agentUT, method)(board, depth)
+                    results[method].append((score, agentUT.root_move))
+                counts[method] += board.counts[0]
+            self.assertEqual(results["alphabeta"], results["pvs"])
+        self.assertLess(counts["pvs"], counts["alphabeta"])
+
+    @timeout(20)
+    def test_pvs_without_ordering(self):
+        """ Test that PVS searches the previous best move first and expands fewer nodes without move ordering """
+        for tt_size in (None, 2**12):
+            rng = random.Random(7)
+            counts = Counter()
+            for _ in range(5):
+                opening = [rng.choice([(2, 2), (2, 3), (3, 3)]), rng.choice([(0, 0), (6, 5), (1, 6)])]
+                scores = {}
+                for method in ("alphabeta", "pvs"):
+                    agentUT = game_agent.CustomPlayer(5, game_agent.custom_score, False, method, tt_size=tt_size)
+                    agentUT.time_left = lambda: 1e3
+                    board = CounterBoard(agentUT, 'null_agent')
+                    for move in opening:
+                        board.apply_move(move)
+                    scores[method] = []
+                    for depth in range(1, 6):
+                        if agentUT.tt is not None:
+                            agentUT.tt.new_search()
+                        score, agentUT.root_move = getattr(agentUT, method)(board, depth)
+                        scores[method].append(score)
+                    counts[method] += board.counts[0]
+                self.assertEqual(scores["alphabeta"], scores["pvs"])
+            self.assertLess(counts["pvs"], counts["alphabeta"])
+
+
+class AspirationTest(unittest.TestCase):
+
+    @timeout(20)
+    def test_aspiration_search(self):
+        """ Test that aspiration windows preserve the score of each iteration """
+        researches = 0
+        for opening in [[(2, 3), (0, 0)], [(3, 3), (4, 5)], [(1, 1), (5, 5)]]:
+            for method in ("alphabeta", "pvs"):
+                agentUT = game_agent.CustomPlayer(5, game_agent.custom_score, False, method,
+                                                  aspiration=0.01)
+                agentUT.time_left = lambda: 1e3
+                board = isolation.Board(agentUT, 'null_agent')
+                for move in opening:
+                    board.apply_move(move)
+                score = None
+                for depth in range(1, 6):
+                    expected, _ = getattr(agentUT, method)(board, depth)
+                    iteration = {'researches': 0}
+                    score, _ = agentUT.aspiration_search(getattr(agentUT, method), board, depth,
+                                                         score, iteration)
+                    self.assertEqual(expected, score)
+                    self.assertLess(iteration['window'][0], score)
+                    self.assertLess(score, iteration['window'][1])
+                    researches += iteration['researches']
+        self.assertGreater(researches, 0)
+
+    @timeout(5)
+    def test_iteration_hook(self):
+        """ Test that get_move reports every iteration of iterative deepening """
+        iterations = []
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score, method="alphabeta",
+                                          aspiration=0.5, iteration_hook=iterations.append)
+        board = isolation.Board(agentUT, 'null_agent')
+        board.apply_move((2, 3))
+        board.apply_move((0, 0))
+        start = curr_time_millis()
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 100 - (curr_time_millis() - start))
+        self.assertEqual([it['depth'] for it in iterations], list(range(1, len(iterations) + 1)))
+        self.assertTrue(all(it['completed'] for it in iterations[:-1]))
+        self.assertTrue(all(it['nodes'] > 0 for it in iterations if it['completed']))
+
+
+
+class EndgameTest(unittest.TestCase):
+
+    def random_partition(self, rng, player_1='p1', player_2='p2', w=5, h=5):
+        """Play random moves until the players are in separate regions."""
+        while True:
+            board = isolation.Board(player_1, player_2, w, h)
+            while board.get_legal_moves() and endgame.find_regions(board) is None:
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            if board.get_legal_moves():
+                return board
+
+    def wins(self, board):
+        """Solve the game by exhaustive search."""
+        return any(not self.wins(board.forecast_move(move)) for move in board.get_legal_moves())
+
+    @timeout(10)
+    def test_solve(self):
+        """ Test that endgame.solve matches exhaustive search """
+        rng = random.Random(5)
+        for _ in range(30):
+            board = self.random_partition(rng)
+            score, move = endgame.solve(board)
+            self.assertEqual(score == float("inf"), self.wins(board))
+            self.assertIn(move, board.get_legal_moves())
+            if score == float("inf"):
+                self.assertFalse(self.wins(board.forecast_move(move)))
+
+    @timeout(5)
+    def test_get_move(self):
+        """ Test that CustomPlayer plays proven endgames without searching """
+        rng = random.Random(6)
+        agentUT = game_agent.CustomPlayer(method='alphabeta', endgame=True)
+        for _ in range(10):
+            board = self.random_partition(rng, agentUT, 'null_agent', 7, 7)
+            if board.active_player != agentUT:
+                continue
+            agentUT.nodes = 0
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+            self.assertEqual(agentUT.nodes, 0)
+            self.assertEqual(move, endgame.solve(board)[1])
+
+    @timeout(5)
+    def test_proven_loss(self):
+        """ Test that CustomPlayer returns a legal move in positions proven lost by the search """
+        moves = [(3, 2), (1, 3), (2, 0), (2, 1), (1, 2), (0, 2), (3, 1), (1, 4)]
+        for method in ['minimax', 'alphabeta', 'pvs']:
+            agentUT = game_agent.CustomPlayer(6, game_agent.custom_score, True, method, endgame=True)
+            board = isolation.Board(agentUT, 'null_agent', 5, 5)
+            for move in moves:
+                board.apply_move(move)
+            self.assertIsNone(endgame.find_regions(board))
+            legal_moves = board.get_legal_moves()
+            self.assertIn(agentUT.get_move(board, legal_moves, lambda: 1e3), legal_moves)
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    @timeout(20)
+    def test_book(self):
+        """ Test that the opening book returns the searched moves of symmetric positions """
+        w, h, plies, depth = 5, 5, 2, 2
+        entries = opening_book.build_book(plies, depth, w, h)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            opening_book.write_book(path, entries, w, h, plies, depth)
+            book = pickle.loads(pickle.dumps(opening_book.OpeningBook(path)))
+            self.assertEqual(len(book), len(entries))
+
+            searcher = game_agent.CustomPlayer(depth, game_agent.custom_score, False, 'alphabeta')
+            searcher.time_left = lambda: 1e3
+            agentUT = game_agent.CustomPlayer(opening_book=book)
+            rng = random.Random(7)
+            for _ in range(20):
+                board = isolation.Board(searcher, agentUT, w, h)
+                for _ in range(rng.randrange(1, plies + 1)):
+                    board.apply_move(rng.choice(board.get_legal_moves()))
+                move = book.probe(board)
+                self.assertIn(move, board.get_legal_moves())
+                if board.active_player == agentUT:
+                    agentUT.nodes = 0
+                    self.assertEqual(move, agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3))
+                    self.assertEqual(agentUT.nodes, 0)
+                else:
+                    # The book move is as good as the move found by searching the position itself.
+                    score, _ = searcher.alphabeta(board, depth)
+                    self.assertEqual(score, searcher.minimax(board.forecast_move(move), depth - 1, False)[0])
+            while board.move_count <= plies:
+                board.apply_move(board.get_legal_moves()[0])
+            self.assertIsNone(book.probe(board))
+            book.close()
+
+    def test_book_without_moves(self):
+        """ Test that the opening book skips the positions for which the search returns no move """
+        self.assertEqual(opening_book.build_book(2, 0, 5, 5, sample_players.null_score), {})
+
+
+def simulation_budget(simulations):
+    """ Return a `time_left` function letting an MCTS player run the given number of simulations """
+    calls = iter(range(simulations, -1, -1))
+    return lambda: 1e3 if next(calls) else 0.
+
+
+class MCTSTest(unittest.TestCase):
+
+    @timeout(10)
+    def test_get_move(self):
+        """ Test that MCTS returns a legal move and restores the board """
+        for rollout_score_fn in (None, sample_players.improved_score):
+            for board_cls in (isolation.Board, isolation.BitBoard, isolation.CompactBoard):
+                agentUT = mcts.MCTSPlayer(rollout_score_fn=rollout_score_fn)
+                board = board_cls(agentUT, 'p2')
+                for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                    board.apply_move(move)
+                state, key = board.to_string(), board.get_hash()
+                legal_moves = board.get_legal_moves()
+                move = agentUT.get_move(board, legal_moves, simulation_budget(200))
+                self.assertIn(move, legal_moves)
+                self.assertEqual((board.to_string(), board.get_hash()), (state, key))
+                self.assertEqual(agentUT.simulations, 200)
+                self.assertEqual(agentUT.root.visits, 200)
+                self.assertEqual(sum(child.visits for child in agentUT.root.children), 200)
+
+    def test_interrupted_rollout(self):
+        """ Test that the board is restored when a simulation is interrupted """
+        for calls in (1, 10, 100):
+            counter = Counter()
+
+            def rollout_score(game, player):
+                counter['calls'] += 1
+                if counter['calls'] == calls:
+                    raise game_agent.Timeout()
+                return sample_players.improved_score(game, player)
+
+            agentUT = mcts.MCTSPlayer(rollout_score_fn=rollout_score)
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                board.apply_move(move)
+            state, key = board.to_string(), board.get_hash()
+            with self.assertRaises(game_agent.Timeout):
+                agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+            self.assertEqual((board.to_string(), board.get_hash(), board.move_count), (state, key, 4))
+
+    @timeout(10)
+    def test_tree_reuse(self):
+        """ Test that MCTS reuses the subtree of the position reached by the last two moves """
+        for reuse_tree in (True, False):
+            agentUT = mcts.MCTSPlayer(reuse_tree=reuse_tree)
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0)]:
+                board.apply_move(move)
+            board.apply_move(agentUT.get_move(board, board.get_legal_moves(), simulation_budget(500)))
+            # Reply with the most visited move of the opponent.
+            child = max(agentUT.root.children, key=lambda node: node.visits)
+            reply = max(child.children, key=lambda node: node.visits)
+            board.apply_move(reply.move)
+            agentUT.get_move(board, board.get_legal_moves(), simulation_budget(100))
+            if reuse_tree:
+                self.assertIs(agentUT.root, reply)
+                self.assertGreater(agentUT.root.visits, 100)
+            else:
+                self.assertEqual(agentUT.root.visits, 100)
+
+            # A different game never reuses the tree.
+            board = isolation.Board(agentUT, 'p2')
+            agentUT.get_move(board, board.get_legal_moves(), simulation_budget(10))
+            self.assertEqual(agentUT.root.visits, 10)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    @timeout(10)
+    def test_search_root(self):
+        """ Test that the best of the searches of a split root is the best move of the full search """
+        for method in ("minimax", "alphabeta", "pvs"):
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, method)
+            agentUT.time_left = lambda: 1e3
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                board.apply_move(move)
+            score, _ = getattr(agentUT, method)(board, 3)
+            legal_moves = board.get_legal_moves()
+            results = [agentUT.search_root(board, legal_moves[i::3], time.time() + 5)
+                       for i in range(3)]
+            best_score, best_move = max((iterations[0] for iterations, _ in results), key=lambda r: r[0])
+            self.assertEqual(score, best_score)
+            self.assertIn(best_move, legal_moves)
+            self.assertEqual(agentUT.legal_moves(board), legal_moves[2::3])
+
+    @timeout(10)
+    def test_search_root_tt(self):
+        """ Test that the searches of a split root neither use nor replace the entry of the full root """
+        for method in ("alphabeta", "pvs"):
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, method, tt_size=2 ** 12)
+            agentUT.time_left = lambda: 1e3
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                board.apply_move(move)
+            getattr(agentUT, method)(board, 3)
+            key = agentUT.tt_key(board)[0]
+            root_entry = agentUT.tt.probe(key)
+            legal_moves = board.get_legal_moves()
+            for i in range(3):
+                agentUT.tt, tt = None, agentUT.tt
+                expected, _ = agentUT.search_root(board, legal_moves[i::3], time.time() + 5)
+                agentUT.tt = tt
+                iterations, _ = agentUT.search_root(board, legal_moves[i::3], time.time() + 5)
+                self.assertEqual(iterations[0][0], expected[0][0])
+                self.assertIn(iterations[0][1], legal_moves[i::3])
+            self.assertEqual(agentUT.tt.probe(key), root_entry)
+
+    @timeout(20)
+    def test_parallel_get_move(self):
+        """ Test that the parallel search returns a legal move in time """
+        for iterative in (True, False):
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, iterative, 'alphabeta')
+            # Force two workers even on a single core.
+            agentUT.workers = 2
+            try:
+                board = isolation.Board(agentUT, 'p2')
+                for move in [(2, 3), (0, 0)]:
+                    board.apply_move(move)
+                for _ in range(2):
+                    start = time.time()
+                    time_left = lambda: 500 - (time.time() - start) * 1000
+                    move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+                    self.assertGreater(time_left(), 0)
+                    self.assertIn(move, board.get_legal_moves())
+                self.assertIsNone(pickle.loads(pickle.dumps(agentUT)).executor)
+            finally:
+                agentUT.close()
+
+    def test_empty_worker(self):
+        """ Test that a worker which completed no iteration does not discard the results of the others """
+
+        class DoneExecutor:
+            """Executor returning the given results of the workers, in order."""
+
+            def __init__(self, results):
+                self.results = iter(results)
+
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_result(next(self.results))
+                return future
+
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, True, 'alphabeta')
+        agentUT.workers = 3
+        agentUT.time_left = lambda: 1e3
+        board = isolation.Board(agentUT, 'p2')
+        for move in [(2, 3), (0, 0)]:
+            board.apply_move(move)
+        legal_moves = board.get_legal_moves()
+        agentUT.executor = DoneExecutor([([(1., legal_moves[0]), (2., legal_moves[0])], 10),
+                                         ([], 0),
+                                         ([(3., legal_moves[1]), (1., legal_moves[1])], 10)])
+        self.assertEqual(agentUT.parallel_search(board, legal_moves, legal_moves[2]), legal_moves[0])
+        agentUT.executor = DoneExecutor([([], 0)] * 3)
+        self.assertEqual(agentUT.parallel_search(board, legal_moves, legal_moves[2]), legal_moves[2])
+        agentUT.executor = None
+
+    def test_single_core(self):
+        """ Test that the number of workers is capped by the number of cores """
+        cores = game_agent.available_cores()
+        self.assertEqual(game_agent.CustomPlayer(workers=cores + 3).workers, cores)
+        self.assertEqual(game_agent.CustomPlayer().workers, 1)
+
+
+class TimeManagementTest(unittest.TestCase):
+
+    def test_time_manager(self):
+        """ Test the predicted cost of iterations and the budget of a move """
+        manager = time_management.TimeManager(stable_fraction=0.5)
+        manager.new_move(150., 10., 8)
+        self.assertTrue(manager.should_start(150.))
+        manager.record_iteration(9, 148., (1, 2))
+        # Before the second iteration, the branching factor is the number of legal moves.
+        self.assertEqual(manager.predicted_cost(), 16.)
+        manager.record_iteration(45, 138., (3, 4))
+        self.assertEqual(manager.predicted_cost(), 50.)
+        self.assertEqual(manager.budget(), 140.)
+        self.assertTrue(manager.should_start(138.))
+        manager.record_iteration(225, 88., (3, 4))
+        # The best move is stable, so only half of the time is used.
+        self.assertEqual(manager.budget(), 70.)
+        self.assertFalse(manager.should_start(88.))
+
+    @timeout(5)
+    def test_managed_get_move(self):
+        """ Test that managed iterative deepening returns without starting an iteration it cannot finish """
+        iterations = []
+        agentUT = game_agent.CustomPlayer(method='alphabeta', inplace=True, time_management=True,
+                                          iteration_hook=iterations.append)
+        board = isolation.Board(agentUT, 'p2')
+        for move in [(2, 3), (0, 0)]:
+            board.apply_move(move)
+        start = timeit.default_timer()
+        time_left = lambda: 150 - (timeit.default_timer() - start) * 1000
+        move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertTrue(iterations)
+        self.assertTrue(all(iteration['completed'] for iteration in iterations))
+        self.assertEqual(move, iterations[-1]['move'])
+
+    def test_check_interval(self):
+        """ Test that the time left is only checked once every check_interval nodes """
+        num_calls = []
+        for check_interval in (1, 4):
+            calls = []
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, False, 'minimax',
+                                              check_interval=check_interval)
+            agentUT.time_left = lambda: calls.append(None) or 1e3
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0)]:
+                board.apply_move(move)
+            agentUT.minimax(board, 3)
+            num_calls.append(len(calls))
+        self.assertEqual(num_calls[1], (num_calls[0] - 1) // 4 + 1)
+        with self.assertRaises(ValueError):
+            game_agent.CustomPlayer(check_interval=0)
+
+
+def call_budget(calls):
+    """ Return a `time_left` function reporting time left for the given number of calls only """
+    remaining = [calls]
+
+    def time_left():
+        remaining[0] -= 1
+        return 1e3 if remaining[0] >= 0 else 0.
+    return time_left
+
+
+class PartialResultsTest(unittest.TestCase):
+
+    @timeout(20)
+    def test_partial_results(self):
+        """ Test that the best move of an interrupted iteration is only played when it is safe """
+        for method in ("minimax", "alphabeta", "pvs"):
+            partial_moves = 0
+            for calls in range(50, 1500, 90):
+                iterations = []
+                agentUT = game_agent.CustomPlayer(method=method, ordering=('hash',), partial_results=True,
+                                                  iteration_hook=iterations.append)
+                board = isolation.Board(agentUT, 'p2')
+                for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                    board.apply_move(move)
+                move = agentUT.get_move(board, board.get_legal_moves(), call_budget(calls))
+                completed = [iteration for iteration in iterations if iteration['completed']]
+                if not completed or move == completed[-1]['move']:
+                    continue
+                partial_moves += 1
+                # The move scores at least as well as the previous best move at the interrupted depth
+                # (the minimax search of this project maximizes at every level).
+                agentUT.time_left = lambda: 1e3
+                depth = len(completed)
+                search = getattr(agentUT, method)
+                scores = [search(board.forecast_move(m), depth, maximizing_player=method == "minimax")[0]
+                          for m in (move, completed[-1]['move'])]
+                self.assertGreaterEqual(scores[0], scores[1])
+            self.assertGreater(partial_moves, 0)
+
+
+class PonderingTest(unittest.TestCase):
+
+    def test_tt_merge(self):
+        """ Test that the entries of a search are merged into another table without replacing deeper ones """
+        table, other = transposition.TranspositionTable(16), transposition.TranspositionTable(16)
+        table.store(1, 5, transposition.EXACT, 1., (0, 0))
+        other.store(2, 1, transposition.EXACT, 2., (0, 1))
+        other.new_search()
+        other.store(1, 3, transposition.LOWER, 3., (0, 2))
+        other.store(3, 2, transposition.UPPER, 4., (0, 3))
+        self.assertEqual([entry.key for entry in other.export()], [1, 3])
+        table.merge(other.export())
+        self.assertEqual(table.probe(1).score, 1.)
+        self.assertIsNone(table.probe(2))
+        self.assertEqual(table.probe(3).move, (0, 3))
+
+    def test_tracked_entries(self):
+        """ Test that the deep entries of the current search are exported deepest first, without scanning the table """
+        table = transposition.TranspositionTable(16)
+        table.store(4, 6, transposition.EXACT, 0., (0, 0))
+        table.track(pondering.SHARED_DEPTH)
+        table.store(1, 2, transposition.EXACT, 1., (0, 1))
+        table.store(2, 3, transposition.LOWER, 2., (0, 2))
+        table.store(3, 5, transposition.UPPER, 3., (0, 3))
+        self.assertEqual(pondering.export(table), [(3, 5, transposition.UPPER, 3., (0, 3), 0),
+                                                   (2, 3, transposition.LOWER, 2., (0, 2), 0)])
+        self.assertEqual([entry[0] for entry in pondering.export(table, limit=1)], [3])
+        table.new_search()
+        self.assertEqual(pondering.export(table), [])
+        self.assertEqual(pondering.export(transposition.TranspositionTable(16)), [])
+
+    def test_merge_budget(self):
+        """ Test that the entries found while pondering are only merged while the time left allows """
+
+        class DonePonderer:
+            """Ponderer whose search of the position reached by `moves` found the given entries."""
+
+            def __init__(self, key, moves, entries):
+                self.key = key
+                self.moves = moves
+                self.entries = entries
+
+            def finish(self, timeout):
+                self.moves = None
+                return [], self.entries
+
+        agentUT = game_agent.CustomPlayer(method='alphabeta', tt_size=2**12)
+        board = isolation.Board(agentUT, 'p2')
+        entries = [(key, 3, transposition.EXACT, 0., (0, 0), 0) for key in range(3 * pondering.MERGE_CHUNK)]
+        for time_left, merged in ((1e3, len(entries)), (2 * agentUT.TIMER_THRESHOLD - 1, 0)):
+            agentUT.tt.clear()
+            agentUT.ponderer = DonePonderer(board.get_hash(), ((0, 0), (1, 2)), entries)
+            agentUT.time_left = lambda: time_left
+            self.assertEqual(agentUT.finish_pondering(board), [])
+            self.assertEqual(len(agentUT.tt), merged)
+
+    @timeout(20)
+    def test_ponder(self):
+        """ Test that the search resumes after pondering the actual position, and only then """
+        player = game_agent.CustomPlayer(ponder=True)
+        self.assertEqual(player.ponder, game_agent.available_cores() > 1)
+        # The pondering process is started with the player.
+        self.assertEqual(player.ponderer is not None, player.ponder)
+        player.close()
+        for hit in (True, False):
+            iterations = []
+            agentUT = game_agent.CustomPlayer(method='alphabeta', tt_size=2**12,
+                                              iteration_hook=iterations.append)
+            # Force pondering even on a single core.
+            agentUT.ponder = True
+            try:
+                board = isolation.Board(agentUT, 'p2')
+                for move in [(2, 3), (0, 0), (4, 4), (1, 2)]:
+                    board.apply_move(move)
+                start = timeit.default_timer()
+                move = agentUT.get_move(board, board.get_legal_moves(),
+                                        lambda: 150 - (timeit.default_timer() - start) * 1000)
+                self.assertEqual(agentUT.ponderer.moves[0], move)
+                board.apply_move(move)
+                reply = agentUT.ponderer.moves[1]
+                if not hit:
+                    reply = next(m for m in board.get_legal_moves() if m != reply)
+                board.apply_move(reply)
+                time.sleep(0.2)
+
+                del iterations[:]
+                start = timeit.default_timer()
+                time_left = lambda: 150 - (timeit.default_timer() - start) * 1000
+                move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+                self.assertGreater(time_left(), 0)
+                self.assertIn(move, board.get_legal_moves())
+                self.assertEqual((agentUT.ponder_hits, agentUT.ponder_misses), (1, 0) if hit else (0, 1))
+                self.assertEqual(iterations[0]['depth'] > 1, hit)
+            finally:
+                agentUT.close()
+
+    @timeout(20)
+    def test_ponderer_jobs(self):
+        """ Test that one process ponders every position, and that late results of a previous position are dropped """
+        agentUT = game_agent.CustomPlayer(method='alphabeta', tt_size=2**12)
+        ponderer = pondering.Ponderer(agentUT, limit=200)
+        try:
+            boards = []
+            for opening in ([(2, 3), (0, 0), (4, 4), (1, 2)], [(3, 3), (6, 6), (5, 4), (4, 4)]):
+                board = isolation.Board(agentUT, 'p2')
+                for move in opening:
+                    board.apply_move(move)
+                boards.append(board)
+            ponderer.start(boards[0], ((4, 4), (1, 2)))
+            time.sleep(0.05)
+            ponderer.finish(0)
+            ponderer.start(boards[1], ((5, 4), (4, 4)), [(1, 5, transposition.EXACT, 1., (0, 0), 0)])
+            time.sleep(0.05)
+            iterations, entries = ponderer.finish(1000)
+            self.assertGreater(len(iterations), 0)
+            for _, move in iterations:
+                self.assertIn(move, boards[1].get_legal_moves())
+            self.assertTrue(entries and all(type(entry) is tuple for entry in entries))
+            self.assertIsNone(ponderer.finish(1000))
+            self.assertTrue(ponderer.is_alive())
+        finally:
+            ponderer.close()
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def test_profile_moves(self):
+        """ Test that the operations of profiled moves are recorded per game, and that the classes are restored """
+        profiler = profiling.Profiler()
+        agentUT = game_agent.CustomPlayer(method='alphabeta', iterative=False, search_depth=3,
+                                          score_fn=sample_players.improved_score, profiler=profiler)
+        profiled = [(isolation.Board, profiling.BOARD_METHODS),
+                    (game_agent.CustomPlayer, ('check_timeout',) + profiling.SEARCH_METHODS)]
+        methods = [vars(cls)[name] for cls, names in profiled for name in names]
+        for game in range(2):
+            board = isolation.Board(agentUT, sample_players.GreedyPlayer())
+            for move in [(2, 3), (0, 0), (4, 4), (1, 2)][:4 - 2 * game]:
+                board.apply_move(move)
+            agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+
+        self.assertEqual(methods, [vars(cls)[name] for cls, names in profiled for name in names])
+        self.assertIs(agentUT.score, sample_players.improved_score)
+
+        self.assertEqual([[record['move_count'] for record in game] for game in profiler.games], [[4], [2]])
+        for record in profiler.moves():
+            for name in ('get_legal_moves', 'forecast_move', 'score', 'check_timeout', 'cutoffs'):
+                self.assertGreater(record['counts'][name], 0)
+            self.assertEqual(record['counts']['check_timeout'], record['nodes'])
+            self.assertEqual(sum(record['nodes_per_ply']), record['nodes'])
+            self.assertEqual(len(record['nodes_per_ply']), 4)
+        summary = profiler.summary()
+        self.assertEqual(summary['total']['moves'], 2)
+        self.assertEqual(summary['total']['time_ms'], sum(record['time_ms'] for record in profiler.moves()))
+        self.assertEqual(summary['total']['nodes'], sum(game['nodes'] for game in summary['games']))
+        self.assertIn('forecast_move', profiling.format_summary(summary['total']))
+
+    @timeout(10)
+    def test_profiled_parallel_player(self):
+        """ Test that a profiled move starts no worker process, which would keep the profiled methods """
+        profiler = profiling.Profiler()
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score, True, 'alphabeta', profiler=profiler)
+        agentUT.workers = 2
+        try:
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0)]:
+                board.apply_move(move)
+            start = time.time()
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: 200 - (time.time() - start) * 1000)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertIsNone(agentUT.executor)
+            self.assertGreater(profiler.moves()[0]['nodes'], 0)
+        finally:
+            agentUT.close()
+
+    def test_unprofiled_player(self):
+        """ Test that profiling a move does not change the search """
+        nodes = []
+        for profiler in (None, profiling.Profiler()):
+            agentUT = game_agent.CustomPlayer(method='alphabeta', iterative=False, search_depth=3,
+                                              score_fn=sample_players.improved_score, profiler=profiler)
+            board = isolation.Board(agentUT, 'p2')
+            for move in [(2, 3), (0, 0)]:
+                board.apply_move(move)
+            nodes.append((agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3), agentUT.nodes))
+        self.assertEqual(nodes[0], nodes[1])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+"""This file contains batch versions of the heuristic evaluation functions,
+which score all the children of a game state at once with NumPy instead of
+building and scoring one board per child. `CustomPlayer` can use them to
+score the children of the nodes at the frontier of its search.
+
+A batch evaluation function is called as `batch_score_fn(game, moves,
+player)`, and returns the list of the scores that the corresponding
+evaluation function would give from the point of view of `player` to the
+game states reached by applying each move of `moves` to `game`.
+
+The mobility of both players in every child is computed in one pass from the
+vector of the blank cells of `game` and the knight-move adjacency matrix of
+the board: moving to a cell only blocks that cell, so the mover has as many
+moves as there are blank neighbors of its new cell, and its opponent loses
+one move if the new cell is a neighbor of its own.
+"""
+
+import numpy as np
+
+from isolation import knight_move_table
+from game_agent import custom_score
+
+
+# Knight-move adjacency matrices, keyed by (width, height).
+_ADJACENCY_MATRICES = {}
+
+
+def adjacency_matrix(width, height):
+    """Return the knight-move adjacency matrix of a board of the given size,
+    whose entry (i, j) is 1 if the cells of indices i and j (i.e.,
+    `row * width + col`) are an L-shaped move apart, and 0 otherwise.
+    """
+    key = (width, height)
+    if key not in _ADJACENCY_MATRICES:
+        matrix = np.zeros((width * height, width * height), dtype=np.intp)
+        for (r, c), neighbors in knight_move_table(width, height).items():
+            for nr, nc in neighbors:
+                matrix[r * width + c, nr * width + nc] = 1
+        _ADJACENCY_MATRICES[key] = matrix
+    return _ADJACENCY_MATRICES[key]
+
+
+def child_mobility(game, moves):
+    """Count the legal moves of both players in the children of `game`.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The parent game state.
+
+    moves : list<(int, int)>
+        Legal moves of the active player of `game`.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        The indices of the cells of the moves, and for each move, the number
+        of legal moves of the player who made it (the inactive player of the
+        child) and of its opponent (the active player of the child).
+    """
+    width = game.width
+    matrix = adjacency_matrix(width, game.height)
+    blank = np.zeros(width * game.height, dtype=np.intp)
+    blank[[r * width + c for r, c in game.get_blank_spaces()]] = 1
+    cells = np.array([r * width + c for r, c in moves], dtype=np.intp)
+
+    mover_moves = matrix[cells] @ blank
+    location = game.get_player_location(game.inactive_player)
+    if location is None:
+        # A player which has not moved yet can move to any blank cell.
+        opponent_moves = np.full(len(moves), blank.sum() - 1)
+    else:
+        opponent_cell = location[0] * width + location[1]
+        opponent_moves = matrix[opponent_cell] @ blank - matrix[opponent_cell, cells]
+    return cells, mover_moves, opponent_moves
+
+
+def batch_improved_score(game, moves, player):
+    """Batch version of `sample_players.improved_score`."""
+    _, mover_moves, opponent_moves = child_mobility(game, moves)
+    is_mover = player == game.active_player
+    if is_mover:
+        scores = (mover_moves - opponent_moves).astype(float)
+    else:
+        scores = (opponent_moves - mover_moves).astype(float)
+    # The opponent of the mover holds the initiative in the children, and
+    # loses if it has no legal move.
+    scores[opponent_moves == 0] = float("inf") if is_mover else float("-inf")
+    return scores.tolist()
+
+
+def batch_custom_score(game, moves, player):
+    """Batch version of `game_agent.custom_score`."""
+    opponent_location = game.get_player_location(game.inactive_player)
+    if opponent_location is None:
+        # `custom_score` needs the locations of both players.
+        return [custom_score(game.forecast_move(move), player) for move in moves]
+
+    width = game.width
+    cells, mover_moves, opponent_moves = child_mobility(game, moves)
+    is_mover = player == game.active_player
+    if is_mover:
+        scores = (mover_moves - opponent_moves).astype(float)
+    else:
+        scores = (opponent_moves - mover_moves).astype(float)
+
+    num_squares = game.width * game.height
+    num_blanks = game.count_blank_spaces() - 1
+    rows, cols = cells // width, cells % width
+
+    # If early game, try to stay in the middle.
+    if num_blanks > 0.8 * num_squares:
+        center = (int(game.height / 2), int(game.width / 2))
+        if is_mover:
+            dist_to_center = np.abs(rows - center[0]) + np.abs(cols - center[1])
+        else:
+            dist_to_center = np.full(len(moves), abs(opponent_location[0] - center[0]) +
+                                     abs(opponent_location[1] - center[1]))
+        scores = np.where(dist_to_center > 0, scores + 1 / np.maximum(dist_to_center, 1), scores + 2)
+
+    # If mid game, try to stay close to the opponent.
+    elif num_blanks > 0.1 * num_squares:
+        dist_to_opp = np.abs(rows - opponent_location[0]) + np.abs(cols - opponent_location[1])
+        scores = scores + 1 / dist_to_opp
+
+    scores[opponent_moves == 0] = float("inf") if is_mover else float("-inf")
+    return scores.tolist()
@@ -0,0 +1,225 @@
+"""
+Simulate many games of Isolation at once with NumPy, for the Monte Carlo
+statistics needed to tune heuristics (e.g., the win rate of the first
+player, or of a greedy player against a random one).
+
+All the games advance in lockstep, one ply at a time: the state of the
+games is an occupancy tensor of shape (games, height, width), flattened to
+(games, height * width) so that cells are addressed by their index (i.e.,
+`row * width + col`), and an array of the cell index of each player in each
+game. Every ply applies one vectorized move to all the unfinished games.
+
+Each player follows a fixed policy:
+
+- 'random': a legal move chosen uniformly at random;
+- 'greedy': a legal move which leaves the opponent without legal moves if
+  there is one, and otherwise the legal move after which the player has the
+  most legal moves, like `sample_players.GreedyPlayer` with `open_move_score`
+  (ties are broken at random rather than by move order).
+"""
+
+import argparse
+import timeit
+
+from collections import namedtuple
+
+import numpy as np
+
+from isolation import knight_move_table
+
+POLICIES = ('random', 'greedy')
+
+# Index of a player which has not moved yet, or of a missing move.
+NOT_MOVED = -1
+
+# Per-game results of a simulation: the index (0 for player 1, 1 for
+# player 2) of the winner, the number of moves played, and the moves
+# themselves as (row, col) pairs, padded with (-1, -1).
+Simulation = namedtuple("Simulation", ["winners", "lengths", "moves"])
+
+# Knight-move tables over cell indices, keyed by (width, height).
+_NEIGHBOR_ARRAYS = {}
+
+
+def neighbor_array(width, height):
+    """Return an array of shape (width * height + 1, 8) whose row i holds the
+    indices of the cells an L-shaped move away from the cell of index i,
+    padded with the index `width * height` of an off-board cell. The last
+    row (the off-board cell) only holds off-board cells.
+    """
+    key = (width, height)
+    if key not in _NEIGHBOR_ARRAYS:
+        off_board = width * height
+        neighbors = np.full((off_board + 1, 8), off_board, dtype=np.intp)
+        for (r, c), cells in knight_move_table(width, height).items():
+            neighbors[r * width + c, :len(cells)] = [nr * width + nc for nr, nc in cells]
+        _NEIGHBOR_ARRAYS[key] = neighbors
+    return _NEIGHBOR_ARRAYS[key]
+
+
+def choose(rng, policy, candidates, legal, blocked, neighbors, opponent):
+    """Choose one legal candidate cell per game according to `policy`.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The random generator.
+
+    policy : {'random', 'greedy'}
+        The policy of the player to move.
+
+    candidates : numpy.ndarray
+        The candidate cells of each game, of shape (games, k).
+
+    legal : numpy.ndarray
+        Whether each candidate cell is a legal move, of shape (games, k).
+
+    blocked : numpy.ndarray
+        The blocked cells of each game, of shape (games, cells + 1), where
+        the last column (the off-board cell) is always blocked.
+
+    neighbors : numpy.ndarray
+        The knight-move table returned by `neighbor_array`.
+
+    opponent : numpy.ndarray
+        The cell of the opponent in each game, of shape (games,), or
+        `NOT_MOVED`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The chosen cell of each game, of shape (games,). Games without
+        legal moves get an arbitrary cell.
+    """
+    priority = rng.random(candidates.shape)
+    if policy == 'greedy':
+        # The number of legal moves from a candidate cell once the player
+        # stands on it (a cell is not an L-shaped move away from itself).
+        rows = np.arange(len(candidates))[:, None]
+        priority += (~blocked[rows[:, :, None], neighbors[candidates]]).sum(axis=2)
+        # The moves after which the opponent has no legal move win the game
+        # (an opponent which has not moved yet can move to any blank cell).
+        opponent_neighbors = neighbors[opponent]
+        opponent_moves = (~blocked[rows, opponent_neighbors]).sum(axis=1)[:, None]
+        blocks_opponent = (candidates[:, :, None] == opponent_neighbors[:, None, :]).any(axis=2)
+        wins = (opponent != NOT_MOVED)[:, None] & (opponent_moves - blocks_opponent == 0)
+        priority[wins] += neighbors.shape[1] + 1
+    elif policy != 'random':
+        raise ValueError("Unknown policy: {!r}".format(policy))
+    priority[~legal] = -1
+    return candidates[np.arange(len(candidates)), priority.argmax(axis=1)]
+
+
+def simulate(num_games, policies=('random', 'random'), width=7, height=7, seed=None, openings=None):
+    """
+    Play `num_games` games between two players following the given policies.
+
+    Parameters
+    ----------
+    num_games : int
+        The number of games.
+
+    policies : (str, str) (optional)
+        The policies of player 1 and player 2, among `POLICIES`.
+
+    width, height : int (optional)
+        The size of the board.
+
+    seed : int (optional)
+        The seed of the random generator; simulations with the same seed and
+        parameters are identical.
+
+    openings : list<list<(int, int)>> (optional)
+        Sequences of moves, all of the same length, to start the games from:
+        the i-th game starts from the `i % len(openings)`-th sequence. The
+        moves must be legal.
+
+    Returns
+    -------
+    Simulation
+        The winners, lengths and moves of the games.
+    """
+    rng = np.random.default_rng(seed)
+    num_cells = width * height
+    neighbors = neighbor_array(width, height)
+    games = np.arange(num_games)
+    all_cells = np.broadcast_to(np.arange(num_cells), (num_games, num_cells))
+
+    # The off-board cell (the last column) is always blocked.
+    blocked = np.zeros((num_games, num_cells + 1), dtype=bool)
+    blocked[:, num_cells] = True
+    locations = np.full((num_games, 2), NOT_MOVED, dtype=np.intp)
+    history = np.full((num_games, num_cells), NOT_MOVED, dtype=np.intp)
+    winners = np.full(num_games, NOT_MOVED, dtype=np.int8)
+    lengths = np.zeros(num_games, dtype=np.intp)
+
+    first_ply = 0
+    if openings:
+        cells = np.array([[r * width + c for r, c in opening] for opening in openings], dtype=np.intp)
+        cells = cells[games % len(cells)]
+        first_ply = cells.shape[1]
+        for ply in range(first_ply):
+            blocked[games, cells[:, ply]] = True
+            locations[:, ply % 2] = cells[:, ply]
+        history[:, :first_ply] = cells
+        lengths[:] = first_ply
+
+    playing = games
+    for ply in range(first_ply, num_cells):
+        if not len(playing):
+            break
+        player = ply % 2
+        game_blocked = blocked[playing]
+        location = locations[playing, player]
+        if (location == NOT_MOVED).all():
+            # The first move of a player may be to any blank cell.
+            candidates = all_cells[:len(playing)]
+            legal = ~game_blocked[:, :num_cells]
+        else:
+            candidates = neighbors[location]
+            legal = ~game_blocked[np.arange(len(playing))[:, None], candidates]
+
+        has_moves = legal.any(axis=1)
+        winners[playing[~has_moves]] = 1 - player
+        opponent = locations[playing, 1 - player]
+        moves = choose(rng, policies[player], candidates, legal, game_blocked, neighbors, opponent)
+
+        playing, moves = playing[has_moves], moves[has_moves]
+        blocked[playing, moves] = True
+        locations[playing, player] = moves
+        history[playing, ply] = moves
+        lengths[playing] = ply + 1
+
+    # The games still playing filled the board, so the next player to move
+    # has no legal moves.
+    winners[playing] = 1 - num_cells % 2
+
+    moves = np.stack([history // width, history % width], axis=2)
+    moves[history == NOT_MOVED] = NOT_MOVED
+    return Simulation(winners, lengths, moves)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=10000, help="number of games to simulate")
+    parser.add_argument("--policies", nargs=2, choices=POLICIES, default=['random', 'random'],
+                        help="policies of player 1 and player 2")
+    parser.add_argument("--width", type=int, default=7, help="number of columns of the board")
+    parser.add_argument("--height", type=int, default=7, help="number of rows of the board")
+    parser.add_argument("--seed", type=int, help="seed of the random generator")
+    args = parser.parse_args()
+
+    start = timeit.default_timer()
+    simulation = simulate(args.games, args.policies, args.width, args.height, args.seed)
+    seconds = timeit.default_timer() - start
+
+    wins = np.bincount(simulation.winners, minlength=2)
+    print("Player 1 ({}): {:.2%} wins".format(args.policies[0], wins[0] / args.games))
+    print("Player 2 ({}): {:.2%} wins".format(args.policies[1], wins[1] / args.games))
+    print("Average game length: {:.2f} moves".format(simulation.lengths.mean()))
+    print("{} games in {:.2f}s ({:.0f} games per second)".format(args.games, seconds, args.games / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Measure the speed of the search agents independently of the wall clock
+limits used by tournament.py, by searching a fixed set of positions to a
+fixed depth with each search method and heuristic.
+
+For each search method, heuristic and depth, the benchmark reports the
+number of nodes searched, the search time, the nodes searched per second,
+the effective branching factor (the ratio between the number of nodes
+searched at this depth and at the previous depth) and the time to depth
+(the time needed to search every depth up to this one, as iterative
+deepening would). With --profile, each record also holds the totals of the
+operations of the searches (see `profiling`), at the cost of slower
+searches. The report also holds the cost of copying a board of the backend
+(`copy` and `forecast_move`, which allocate a board at each node of the
+searches which are not in place). Results are written as JSON, so that
+regressions in `isolation.Board` or `game_agent.py` can be tracked over
+time: with --baseline, the report is compared with a previous one, and the
+benchmark fails if a board operation became more expensive by more than the
+tolerance, or a search visits more nodes.
+
+The positions are given as sequences of moves from the empty board. They
+are generated from a seed, and can be saved to and loaded from a JSON file
+so that the same positions are used across versions of the code.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+
+from game_agent import CustomPlayer
+from game_agent import custom_score
+from isolation import Board
+from profiling import Profiler
+from profiling import summarize
+from sample_players import improved_score
+from sample_players import null_score
+from sample_players import open_move_score
+from tournament import BOARDS
+
+try:
+    import batch_eval
+except ImportError:  # NumPy is not installed
+    batch_eval = None
+
+HEURISTICS = {"custom": custom_score,
+              "improved": improved_score,
+              "open": open_move_score,
+              "null": null_score}
+
+METHODS = ["minimax", "alphabeta", "pvs"]
+
+# Batch versions of the heuristics (see --batch).
+BATCH_HEURISTICS = {"custom": "batch_custom_score",
+                    "improved": "batch_improved_score"}
+
+NUM_POSITIONS = 20  # number of positions generated by default
+NUM_COPIES = 1000  # number of copies timed per position by `board_costs`
+TOLERANCE = 0.5  # relative increase of a board cost reported as a regression by `compare`
+MAX_PLIES = 16  # maximum number of moves played to reach a position
+
+
+def make_positions(num_positions, seed=None, max_plies=MAX_PLIES, width=7, height=7):
+    """
+    Generate a set of positions by playing random moves from the empty board.
+    Each position is reached after an even number of moves (between 2 and
+    `max_plies`), so player 1 holds the initiative, and has legal moves.
+
+    Returns
+    ----------
+    list<list<(int, int)>>
+        For each position, the list of moves leading to it.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        board = Board("player1", "player2", width, height)
+        moves = []
+        for _ in range(rng.randrange(2, max_plies + 1, 2)):
+            legal_moves = board.get_legal_moves()
+            if not legal_moves:
+                break
+            moves.append(rng.choice(legal_moves))
+            board.apply_move(moves[-1])
+        if len(moves) % 2 == 0 and board.get_legal_moves():
+            positions.append(moves)
+    return positions
+
+
+def save_positions(positions, path):
+    """ Save a set of positions to a JSON file. """
+    with open(path, "w") as f:
+        json.dump([[list(move) for move in moves] for moves in positions], f)
+
+
+def load_positions(path):
+    """ Load a set of positions saved by `save_positions`. """
+    with open(path) as f:
+        return [[tuple(move) for move in moves] for moves in json.load(f)]
+
+
+def board_costs(board_cls, positions, number=NUM_COPIES, width=7, height=7):
+    """
+    Measure the cost of copying a board in each position.
+
+    Returns
+    ----------
+    dict
+        The average time (in microseconds) of `copy()` and of
+        `forecast_move()` (with the first legal move), and the average
+        number of bytes allocated by `copy()` for the copied board.
+    """
+    copy_seconds = forecast_seconds = 0.
+    copy_bytes = 0
+    for moves in positions:
+        game = board_cls("player1", "player2", width, height)
+        for move in moves:
+            game.apply_move(move)
+        move = game.get_legal_moves()[0]
+        copy_seconds += min(timeit.repeat(game.copy, number=number, repeat=3))
+        forecast_seconds += min(timeit.repeat(lambda: game.forecast_move(move), number=number, repeat=3))
+        game.copy()
+        # The copies are kept alive, so that their memory is counted.
+        copies = []
+        tracemalloc.start()
+        try:
+            start = tracemalloc.get_traced_memory()[0]
+            for _ in range(number):
+                copies.append(game.copy())
+            copy_bytes += tracemalloc.get_traced_memory()[0] - start
+        finally:
+            tracemalloc.stop()
+    calls = number * len(positions)
+    return {"copy_us": 1e6 * copy_seconds / calls,
+            "forecast_move_us": 1e6 * forecast_seconds / calls,
+            "copy_bytes": copy_bytes / calls}
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """
+    Compare a report with the report of a baseline on the same positions.
+
+    Returns
+    ----------
+    list<str>
+        A description of each regression: a board cost (see `board_costs`)
+        exceeding the baseline by more than `tolerance`, as a fraction of
+        the baseline, or a record (matched by method, heuristic, batch flag
+        and depth) with more nodes than the baseline. The search times are
+        not compared, as they are too short to be reliable.
+    """
+    regressions = []
+    for name, value in sorted(report["board_costs"].items()):
+        previous = baseline.get("board_costs", {}).get(name)
+        if previous and value > previous * (1 + tolerance):
+            regressions.append("{}: {:.2f} (baseline {:.2f})".format(name, value, previous))
+    key = lambda record: (record["method"], record["heuristic"], record["batch"], record["depth"])
+    previous_records = {key(record): record for record in baseline.get("results", [])}
+    for record in report["results"]:
+        previous = previous_records.get(key(record))
+        if previous and record["nodes"] > previous["nodes"]:
+            regressions.append("{} {}{} depth {}: {} nodes (baseline {})".format(
+                record["method"], record["heuristic"], " (batch)" if record["batch"] else "",
+                record["depth"], record["nodes"], previous["nodes"]))
+    return regressions
+
+
+def run_search(player, board_cls, moves, depth, width=7, height=7):
+    """
+    Search the position reached by `moves` to the given depth with `player`.
+
+    Returns
+    ----------
+    (int, float)
+        The number of nodes searched and the search time (in seconds).
+    """
+    game = board_cls(player, "opponent", width, height)
+    for move in moves:
+        game.apply_move(move)
+    player.time_left = lambda: float("inf")
+    player.nodes = 0
+    search = getattr(player, player.method)
+    start = timeit.default_timer()
+    if player.profiler is None:
+        search(game, depth)
+    else:
+        with player.profiler.profile_move(player, game):
+            search(game, depth)
+    return player.nodes, timeit.default_timer() - start
+
+
+def benchmark(positions, depth, methods=METHODS, heuristics=sorted(HEURISTICS),
+              board_cls=Board, player_args=None, batch=False, profile=False):
+    """
+    Search every position to every depth from 1 to `depth` with every search
+    method and heuristic.
+
+    Parameters
+    ----------
+    positions : list<list<(int, int)>>
+        The positions to search, as lists of moves from the empty board.
+
+    depth : int
+        The maximum search depth.
+
+    methods : list<str> (optional)
+        The search methods of `CustomPlayer` to benchmark.
+
+    heuristics : list<str> (optional)
+        The names (keys of `HEURISTICS`) of the heuristics to benchmark.
+
+    board_cls : class (optional)
+        The board backend.
+
+    player_args : dict (optional)
+        Extra keyword arguments for the `CustomPlayer` constructor (e.g.,
+        `inplace`, `tt_size` or `ordering`).
+
+    batch : bool (optional)
+        Flag indicating whether the heuristics which have a batch version in
+        `batch_eval` score the frontier of the search with it.
+
+    profile : bool (optional)
+        Flag indicating whether to profile the searches, and add the totals
+        of their operations to the records (see `profiling.summarize`).
+
+    Returns
+    ----------
+    list<dict>
+        One record per method, heuristic and depth, with the totals over
+        all the positions.
+    """
+    results = []
+    for method in methods:
+        for name in heuristics:
+            args = dict(player_args or {})
+            if batch and name in BATCH_HEURISTICS:
+                args["batch_score_fn"] = getattr(batch_eval, BATCH_HEURISTICS[name])
+            previous_nodes = None
+            time_to_depth = 0.
+            for d in range(1, depth + 1):
+                nodes = 0
+                seconds = 0.
+                if profile:
+                    args["profiler"] = Profiler()
+                for moves in positions:
+                    # A fresh player for every search, so that no state (e.g., a
+                    # transposition table) carries over from one search to the next.
+                    player = CustomPlayer(search_depth=d, score_fn=HEURISTICS[name], iterative=False,
+                                          method=method, **args)
+                    position_nodes, position_seconds = run_search(player, board_cls, moves, d)
+                    nodes += position_nodes
+                    seconds += position_seconds
+                time_to_depth += seconds
+                results.append({"method": method,
+                                "heuristic": name,
+                                "batch": "batch_score_fn" in args,
+                                "depth": d,
+                                "nodes": nodes,
+                                "seconds": seconds,
+                                "nodes_per_second": nodes / seconds if seconds else None,
+                                "effective_branching_factor": nodes / previous_nodes if previous_nodes else None,
+                                "time_to_depth": time_to_depth})
+                if profile:
+                    results[-1]["profile"] = summarize(args["profiler"].moves())
+                previous_nodes = nodes
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=4, help="maximum search depth")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=["minimax", "alphabeta"],
+                        help="search methods to benchmark")
+    parser.add_argument("--heuristics", nargs="+", choices=sorted(HEURISTICS), default=sorted(HEURISTICS),
+                        help="heuristics to benchmark")
+    parser.add_argument("--board", choices=sorted(BOARDS), default="list", help="board backend")
+    parser.add_argument("--inplace", action="store_true", help="search with Board.push/pop")
+    parser.add_argument("--batch", action="store_true",
+                        help="score the frontier of the search with the batch heuristics (requires NumPy)")
+    parser.add_argument("--profile", action="store_true",
+                        help="count and time the operations of the searches (slows the searches down)")
+    parser.add_argument("--seed", type=int, default=0, help="seed used to generate the positions")
+    parser.add_argument("--num-positions", type=int, default=NUM_POSITIONS,
+                        help="number of positions to generate")
+    parser.add_argument("--positions", help="JSON file of positions to search, as saved by --save-positions")
+    parser.add_argument("--save-positions", help="JSON file to save the searched positions to")
+    parser.add_argument("--output", help="JSON file to write the results to (default: standard output)")
+    parser.add_argument("--baseline", help="JSON file of a previous report to check the results against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative increase of a board cost from the baseline reported as a regression")
+    args = parser.parse_args()
+    if args.batch and batch_eval is None:
+        parser.error("--batch requires NumPy")
+
+    if args.positions:
+        positions = load_positions(args.positions)
+    else:
+        positions = make_positions(args.num_positions, args.seed)
+    if args.save_positions:
+        save_positions(positions, args.save_positions)
+
+    report = {"python": platform.python_version(),
+              "board": args.board,
+              "inplace": args.inplace,
+              "num_positions": len(positions),
+              "board_costs": board_costs(BOARDS[args.board], positions),
+              "results": benchmark(positions, args.depth, args.methods, args.heuristics,
+                                   BOARDS[args.board], {"inplace": args.inplace}, args.batch, args.profile)}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("Regression: " + regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
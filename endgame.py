@@ -0,0 +1,210 @@
+"""This file contains the endgame solver used by `CustomPlayer` to play
+partitioned positions exactly.
+
+Once no blank cell can be reached by both players, the players can no longer
+interfere with each other, and the game reduces to a race: each player moves
+along the longest path (i.e., the longest knight's tour) through its own
+region, and the player holding the initiative wins if and only if its path
+is strictly longer than the path of its opponent.
+
+Cells are handled as indices (`row * width + col`) and sets of cells as
+integer bitmasks, as in `isolation.BitBoard`.
+"""
+
+from isolation.bitboard import knight_tables
+
+
+# Default maximum number of states expanded by each longest path search.
+NODE_LIMIT = 2000
+
+# Bitmasks of the cells of each color of the checkerboard, keyed by
+# (width, height).
+_COLOR_MASKS = {}
+
+
+class NodeLimit(Exception):
+    """Raised when a longest path search expands too many states."""
+    pass
+
+
+def color_masks(width, height):
+    """Return the bitmasks of the cells (row, col) with an even and an odd
+    `row + col`, respectively. A knight move always changes the color of the
+    cell.
+    """
+    key = (width, height)
+    if key not in _COLOR_MASKS:
+        masks = [0, 0]
+        for row in range(height):
+            for col in range(width):
+                masks[(row + col) % 2] |= 1 << (row * width + col)
+        _COLOR_MASKS[key] = tuple(masks)
+    return _COLOR_MASKS[key]
+
+
+def blank_mask(game):
+    """Return the bitmask of the blank cells of `game`."""
+    mask = 0
+    for row, col in game.get_blank_spaces():
+        mask |= 1 << (row * game.width + col)
+    return mask
+
+
+def reachable(masks, cell, available):
+    """Return the bitmask of the cells among `available` which can be reached
+    from `cell` by a sequence of knight moves through `available`.
+    """
+    reached = 0
+    frontier = masks[cell] & available
+    while frontier:
+        reached |= frontier
+        neighbors = 0
+        while frontier:
+            bit = frontier & -frontier
+            frontier ^= bit
+            neighbors |= masks[bit.bit_length() - 1]
+        frontier = neighbors & available & ~reached
+    return reached
+
+
+def find_regions(game):
+    """Return the regions of the active and the inactive player, i.e. the
+    bitmasks of the blank cells that each player can reach, if no blank cell
+    can be reached by both players. Return None otherwise, or if a player has
+    not moved yet.
+    """
+    locations = [game.get_player_location(player) for player in (game.active_player, game.inactive_player)]
+    if None in locations:
+        return None
+    masks, _ = knight_tables(game.width, game.height)
+    available = blank_mask(game)
+    regions = tuple(reachable(masks, row * game.width + col, available) for row, col in locations)
+    if regions[0] & regions[1]:
+        return None
+    return regions
+
+
+def longest_path(width, height, cell, available, node_limit=NODE_LIMIT, target=None):
+    """Search for the longest path from `cell` through the cells of
+    `available`, with a depth-first search memoized on (cell, available
+    cells) and pruned by an upper bound on the length of the path: a path of
+    L moves goes through ceil(L / 2) reachable cells of the color opposite
+    to its current cell, and floor(L / 2) of the same color.
+
+    Parameters
+    ----------
+    width, height : int
+        The size of the board.
+
+    cell : int
+        The index of the starting cell.
+
+    available : int
+        The bitmask of the cells the path may go through.
+
+    node_limit : int (optional)
+        The maximum number of states expanded by the search.
+
+    target : int (optional)
+        A number of moves after which the search stops, once a path at least
+        that long is found (e.g., a path long enough to win).
+
+    Returns
+    -------
+    (int, int, int)
+        A lower bound and an upper bound on the number of moves of the
+        longest path, which are equal unless the search was cut short by the
+        node limit or the target, and the index of the first cell of the
+        longest path found (or None if there is no move from `cell`).
+    """
+    if target is None:
+        target = float("inf")
+    masks, _ = knight_tables(width, height)
+    colors = color_masks(width, height)
+    memo = {}
+    nodes = 0
+    best_length = 0
+    best_move = None
+    root_move = None
+
+    def bound(cell, available):
+        region = reachable(masks, cell, available)
+        same = bin(region & colors[(cell // width + cell % width) % 2]).count("1")
+        opposite = bin(region).count("1") - same
+        return min(2 * opposite, 2 * same + 1)
+
+    def search(cell, available, depth):
+        nonlocal nodes, best_length, best_move
+        key = (cell, available)
+        if key in memo:
+            return memo[key]
+        nodes += 1
+        if nodes > node_limit:
+            raise NodeLimit()
+        limit = bound(cell, available)
+        length = 0
+        moves = masks[cell] & available
+        while moves and length < limit and best_length < target:
+            bit = moves & -moves
+            moves ^= bit
+            length = max(length, 1 + search(bit.bit_length() - 1, available & ~bit, depth + 1))
+            if depth + length > best_length:
+                best_length, best_move = depth + length, root_move
+        memo[key] = length
+        return length
+
+    upper = bound(cell, available)
+    moves = masks[cell] & available
+    try:
+        while moves and best_length < min(upper, target):
+            bit = moves & -moves
+            moves ^= bit
+            root_move = bit.bit_length() - 1
+            if best_move is None:
+                best_length, best_move = 1, root_move
+            search(root_move, available & ~bit, 1)
+    except NodeLimit:
+        return best_length, upper, best_move
+    if best_length >= target:
+        return best_length, upper, best_move
+    return best_length, best_length, best_move
+
+
+def solve(game, node_limit=NODE_LIMIT):
+    """Solve a partitioned position.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state to solve.
+
+    node_limit : int (optional)
+        The maximum number of states expanded by the longest path search of
+        each player.
+
+    Returns
+    -------
+    (float, (int, int))
+        If the players are in separate regions and the longest path searches
+        prove the outcome, the utility of the game for the active player
+        (+inf or -inf) and the first move of its longest path (or None if it
+        has no legal move). Otherwise, None.
+    """
+    regions = find_regions(game)
+    if regions is None:
+        return None
+    cells = []
+    for player in (game.active_player, game.inactive_player):
+        row, col = game.get_player_location(player)
+        cells.append(row * game.width + col)
+    # The path of the opponent is searched first, so that the search of the
+    # active player can stop as soon as it finds a path long enough to win.
+    opp_lower, opp_upper, _ = longest_path(game.width, game.height, cells[1], regions[1], node_limit)
+    own_lower, own_upper, cell = longest_path(game.width, game.height, cells[0], regions[0], node_limit,
+                                              opp_upper + 1)
+    move = divmod(cell, game.width) if cell is not None else None
+    if own_lower > opp_upper:
+        return float("inf"), move
+    if own_upper <= opp_lower:
+        return float("-inf"), move
+    return None
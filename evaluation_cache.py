@@ -0,0 +1,78 @@
+"""This file contains the evaluation cache used by `CustomPlayer` to avoid
+scoring the same game state more than once, e.g. in successive iterations
+of iterative deepening.
+"""
+
+from collections import OrderedDict
+
+
+class EvaluationCache:
+    """Wrap a heuristic evaluation function, such as `custom_score` or
+    `improved_score`, with a cache of its results keyed by the hash of the
+    game state (see `isolation.Board.get_hash`) and the player from whose
+    point of view the state is scored.
+
+    The cache holds at most `capacity` results, and evicts the least
+    recently used result when it is full. An instance is called like the
+    wrapped function, so it can be passed as the `score_fn` of a player.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The evaluation function, called as `score_fn(game, player)`.
+
+    capacity : int (optional)
+        The maximum number of cached results.
+
+    canonical : bool (optional)
+        Flag indicating whether results are keyed by the hash of the
+        canonical form of the game state (see
+        `isolation.Board.get_canonical_form`), so that symmetric states
+        share their results. Only valid if `score_fn` gives the same score
+        to symmetric states, as the heuristics of this project do.
+    """
+
+    def __init__(self, score_fn, capacity=2**16, canonical=False):
+        if capacity < 1:
+            raise ValueError("The evaluation cache must hold at least one result.")
+        self.score_fn = score_fn
+        self.capacity = capacity
+        self.canonical = canonical
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, game, player):
+        key = (game.get_canonical_hash() if self.canonical else game.get_hash(), player)
+        results = self.results
+        if key in results:
+            self.hits += 1
+            results.move_to_end(key)
+            return results[key]
+        self.misses += 1
+        score = self.score_fn(game, player)
+        results[key] = score
+        if len(results) > self.capacity:
+            results.popitem(last=False)
+            self.evictions += 1
+        return score
+
+    def __len__(self):
+        """Return the number of cached results."""
+        return len(self.results)
+
+    @property
+    def hit_rate(self):
+        """The fraction of the calls answered from the cache (None before the
+        first call).
+        """
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else None
+
+    def clear(self):
+        """Remove all the cached results and reset the counters."""
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -6,8 +6,29 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import math
+import os
 import random
 import operator
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+from endgame import solve as solve_endgame
+from evaluation_cache import EvaluationCache
+from move_ordering import MoveOrderer
+from pondering import MERGE_CHUNK
+from pondering import PONDER_LIMIT
+from pondering import RESULTS_WAIT
+from pondering import Ponderer
+from pondering import export as export_entries
+from time_management import TimeManager
+from transposition import EXACT
+from transposition import LOWER
+from transposition import UPPER
+from transposition import PLAYER_2_PERSPECTIVE
+from transposition import TranspositionTable
 
 
 class Timeout(Exception):
@@ -15,6 +36,16 @@ class Timeout(Exception):
     pass
 
 
+def available_cores():
+    """Return the number of cores this process may run on, which is less than
+    the number of cores of the machine if it is restricted (e.g., by the CPU
+    affinity of a container).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -45,15 +76,15 @@ def custom_score(game, player):
 
     # Heuristic 1
     num_squares = game.width * game.height
-    num_blanks = len(game.get_blank_spaces())
+    num_blanks = game.count_blank_spaces()
 
     center = (int(game.height / 2), int(game.width / 2))
 
     own_position = game.get_player_location(player)
     opp_position = game.get_player_location(game.get_opponent(player))
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_legal_moves(player)
+    opp_moves = game.count_legal_moves(game.get_opponent(player))
 
     score = float(own_moves - opp_moves)
 
@@ -202,23 +233,192 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'pvs'} (optional)
+        The name of the search method to use in get_move(): 'pvs' is
+        alpha-beta with principal variation (null window) search.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    inplace : boolean (optional)
+        Flag indicating whether the search should allocate a new board for
+        every node with `Board.forecast_move()` (False), or apply and revert
+        the moves on the searched board itself with `Board.push()` and
+        `Board.pop()` (True).
+
+    tt_size : int (optional)
+        The number of slots of the transposition table used by alpha-beta
+        search, which is kept across iterative deepening iterations and
+        across moves. If None, no transposition table is used.
+
+    tt_replacement : {'always', 'depth', 'age'} (optional)
+        The replacement strategy of the transposition table (see
+        `transposition.TranspositionTable`).
+
+    ordering : iterable<str> (optional)
+        The components of the move ordering used by alpha-beta search, among
+        'hash', 'killers', 'history' and 'mobility' (see
+        `move_ordering.MoveOrderer`). If None, moves are searched in the
+        order in which they are generated.
+
+    aspiration : float (optional)
+        Half-width of the aspiration window used by iterative deepening with
+        alpha-beta or PVS search: each iteration first searches a window
+        centred on the score of the previous iteration, and searches again
+        with a wider window if the score falls outside of it. If None, every
+        iteration searches the full (-inf, +inf) window.
+
+    aspiration_growth : float (optional)
+        Factor by which the aspiration window is widened, on the side on
+        which the search failed, before each re-search.
+
+    iteration_hook : callable (optional)
+        A function called with a dictionary of statistics at the end of each
+        iteration of iterative deepening, including the iteration cut short
+        by the timeout (see `get_move`).
+
+    endgame : boolean (optional)
+        Flag indicating whether to solve partitioned positions, in which the
+        players can no longer reach each other, with the exact solver of
+        `endgame.solve`. Proven wins and losses are played immediately, and
+        iterative deepening stops as soon as the search proves the outcome.
+
+    opening_book : `opening_book.OpeningBook` (optional)
+        An opening book probed before searching: the book move is returned
+        immediately for the positions it holds. If None, no book is used.
+
+    tt_symmetry : boolean (optional)
+        Flag indicating whether the transposition table is keyed by the
+        canonical form of the game states (see `Board.get_canonical_form`),
+        so that symmetric game states share their entries.
+
+    eval_cache_size : int (optional)
+        The capacity of the cache of the results of `score_fn` (see
+        `evaluation_cache.EvaluationCache`), which is kept across iterative
+        deepening iterations and across moves. If None, no cache is used.
+
+    batch_score_fn : callable (optional)
+        A batch version of `score_fn` (see `batch_eval`), used to score all
+        the children of the nodes at depth 1 at once instead of scoring one
+        board per child. If None, every child is scored with `score_fn`.
+
+    workers : int (optional)
+        The number of processes searching in parallel: the legal moves of
+        the root are split between the workers, which each search their
+        share within the time budget of the move (see `parallel_search`).
+        The number of workers is capped by the number of cores, so the
+        search is done in this process on a single core.
+
+    time_management : boolean (optional)
+        Flag indicating whether iterative deepening only starts the
+        iterations which are expected to finish within the budget of the
+        move (see `time_management.TimeManager`), instead of searching until
+        the timeout.
+
+    check_interval : int (optional)
+        The number of nodes searched between two checks of the time left.
+        Checking less often saves the cost of calling `time_left`, but
+        `timeout` must then leave enough time to search that many nodes.
+
+    partial_results : boolean (optional)
+        Flag indicating whether `get_move` may return the best move found by
+        an iteration interrupted by the timeout, instead of the best move of
+        the last completed iteration (see `record_root_move`).
+
+    ponder : boolean (optional)
+        Flag indicating whether to keep searching during the turn of the
+        opponent, from the position reached by its predicted reply (see
+        `pondering`). Pondering is disabled on a single core, where it would
+        take CPU time from the opponent. The pondering process is started with
+        the player, and stopped by `close`.
+
+    ponder_limit : float (optional)
+        The maximum time (in milliseconds) spent pondering a position.
+
+    profiler : `profiling.Profiler` (optional)
+        A profiler recording the operations of the search of each move. If
+        None, the search is not instrumented. Profiled moves are searched
+        without the worker processes of the parallel search, which the
+        profiler does not see.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=15.):
+                 iterative=True, method='minimax', timeout=15., inplace=False,
+                 tt_size=None, tt_replacement='depth', ordering=None,
+                 aspiration=None, aspiration_growth=4., iteration_hook=None, endgame=False,
+                 opening_book=None, tt_symmetry=False, eval_cache_size=None,
+                 batch_score_fn=None, workers=1, time_management=False, check_interval=1,
+                 partial_results=False, ponder=False, ponder_limit=PONDER_LIMIT, profiler=None):
         self.search_depth = search_depth
         self.iterative = iterative
-        self.score = score_fn
+        self.score = EvaluationCache(score_fn, eval_cache_size) if eval_cache_size else score_fn
+        self.batch_score = batch_score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.inplace = inplace
+        self.tt = TranspositionTable(tt_size, tt_replacement) if tt_size else None
+        self.tt_symmetry = tt_symmetry
+        self.orderer = MoveOrderer(ordering) if ordering is not None else None
+        self.ply = 0
+        self.root_move = None
+        self.aspiration = aspiration
+        self.aspiration_growth = aspiration_growth
+        self.iteration_hook = iteration_hook
+        self.endgame = endgame
+        self.opening_book = opening_book
+        self.nodes = 0
+        self.workers = max(1, min(workers, available_cores()))
+        # The process pool is created on the first parallel search.
+        self.executor = None
+        # The root moves searched by a worker of a parallel search.
+        self.root_moves = None
+        self.time_manager = TimeManager() if time_management else None
+        if check_interval < 1:
+            raise ValueError("The interval between checks of the time left must be at least one node.")
+        self.check_interval = check_interval
+        # The number of nodes to search before the next check of the time left.
+        self.countdown = 1
+        self.partial_results = partial_results
+        # The root moves fully searched by the current search, and the best of them.
+        self.partial_moves = []
+        self.partial_best = None
+        self.ponder = ponder and available_cores() > 1
+        self.ponder_limit = ponder_limit
+        # The search of the predicted position, and the iterations it completed
+        # if the opponent played the predicted reply.
+        self.ponderer = None
+        self.ponder_iterations = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        # The time (in milliseconds) taken to start pondering after the last move.
+        self.ponder_cost = 0.
+        self.profiler = profiler
+        # The pondering process is started with the player rather than on its
+        # first move, whose clock would pay for it.
+        if self.ponder:
+            self.ponderer = Ponderer(self, self.ponder_limit)
+
+    def __getstate__(self):
+        # The process pool, the timer (a closure of `Board.play`), the
+        # iteration hook and the pondering process are not sent to the
+        # workers of a parallel search.
+        state = self.__dict__.copy()
+        state.update(executor=None, time_left=None, iteration_hook=None, ponderer=None)
+        return state
+
+    def close(self):
+        """Shut down the process pool of the parallel search and stop
+        pondering, if needed.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.ponderer is not None:
+            self.ponderer.close()
+            self.ponderer = None
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -248,9 +448,42 @@ class CustomPlayer:
         (int, int)
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
+
+        Notes
+        -----
+            If `self.iteration_hook` is set, it is called after each iteration
+            of iterative deepening with a dictionary holding the 'depth' of the
+            iteration, whether it 'completed' before the timeout, its final
+            search 'window', the number of 'researches' due to aspiration
+            windows, the number of 'nodes' searched, the elapsed 'time' (in
+            milliseconds), and the 'score' and 'move' found.
         """
 
         self.time_left = time_left
+        self.countdown = 1
+        self.ponder_iterations = self.finish_pondering(game)
+        if self.profiler is None:
+            move = self.choose_move(game, legal_moves)
+        else:
+            with self.profiler.profile_move(self, game):
+                move = self.choose_move(game, legal_moves)
+        # The search returns when the time left reaches the timer threshold, and
+        # starting to ponder is expected to take as long as after the last move.
+        if self.ponder and move != (-1, -1) and self.time_left() - self.ponder_cost > self.TIMER_THRESHOLD / 2:
+            start = self.time_left()
+            self.start_pondering(game, move)
+            self.ponder_cost = start - self.time_left()
+        return move
+
+    def choose_move(self, game, legal_moves):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires (see `get_move`).
+        """
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.orderer is not None:
+            self.orderer.new_search()
+        self.root_move = None
 
         # Perform any required initializations, including selecting an initial
         # move from the game board (i.e., an opening book), or returning
@@ -258,6 +491,11 @@ class CustomPlayer:
         if not legal_moves:
             return (-1, -1)
 
+        if self.opening_book is not None:
+            book_move = self.opening_book.probe(game)
+            if book_move is not None:
+                return book_move
+
         # The best move is initially the one that scores best on the score function.
         score, best_move = max((self.score(game, self), move) for move in legal_moves)
 
@@ -267,15 +505,27 @@ class CustomPlayer:
         if game.move_count <= 1:
             # pick the center square if it is free
             center = (int(game.height / 2), int(game.width / 2))
-            if center in game.get_blank_spaces():
+            if game.move_is_legal(center):
                 return center
             # or the best available move if the center is taken.
             else:
                 return best_move
 
         else:
-            # Is the player the maximizing player, i.e. the active player in the current game?
-            maximizing_player = game.active_player == game.__player_1__
+            # Play proven wins and losses in partitioned positions without searching.
+            if self.endgame:
+                solution = solve_endgame(game)
+                if solution is not None:
+                    return solution[1]
+
+            # A profiled move is searched in this process only (see `profiling`).
+            if self.workers > 1 and len(legal_moves) > 1 and self.profiler is None:
+                return self.parallel_search(game, legal_moves, best_move)
+
+            # The search method (minimax, alphabeta or pvs) corresponding to self.method.
+            search = getattr(self, self.method)
+            # Statistics of the current iteration of iterative deepening.
+            iteration = None
 
         # try:
         #     # The search method call (alpha beta or minimax) should happen in
@@ -285,29 +535,397 @@ class CustomPlayer:
         #     pass
 
             try:
+                # The agent always holds the initiative when asked for a move, so the root of
+                # the search is a MAX node.
                 # If iterative, increment depth each time.
                 if self.iterative:
                     depth = 1
+                    score = None
+                    # Resume after the iterations completed while pondering this position.
+                    if self.ponder_iterations:
+                        score, best_move = self.ponder_iterations[-1]
+                        depth = len(self.ponder_iterations) + 1
+                        self.root_move = best_move
+                        if self.endgame and math.isinf(score):
+                            return best_move
+                    if self.time_manager is not None:
+                        self.time_manager.new_move(self.time_left(), self.TIMER_THRESHOLD, len(legal_moves))
                     while True:
                         if self.time_left() < self.TIMER_THRESHOLD:
                             raise Timeout()
-                        # To avoid duplicating code (same code for minimax and alphabeta),
-                        # create a string which includes the name of the method as variable,
-                        # and evaluate it using `eval`.
-                        _, best_move = eval('self.' + self.method + '(game, depth, maximizing_player)')
+                        # Do not start an iteration which is not expected to finish in time.
+                        if self.time_manager is not None and not self.time_manager.should_start(self.time_left()):
+                            return best_move
+                        iteration = {'depth': depth, 'completed': False, 'window': None, 'researches': 0,
+                                     'nodes': self.nodes, 'time': self.time_left(),
+                                     'score': None, 'move': None}
+                        score, best_move = self.aspiration_search(search, game, depth, score, iteration)
+                        iteration.update(completed=True, score=score, move=best_move)
+                        if self.time_manager is not None:
+                            self.time_manager.record_iteration(self.nodes - iteration['nodes'], self.time_left(),
+                                                               best_move)
+                        self.report_iteration(iteration)
+                        iteration = None
+                        # The outcome is proven, so deeper iterations cannot change it.
+                        if self.endgame and math.isinf(score):
+                            return best_move
+                        # Search the best move of this iteration first in the next one.
+                        self.root_move = best_move
                         depth += 1
-                # If not iterative, do a depth-limited search using either minimax or alphabeta.
+                # If not iterative, do a depth-limited search using the selected method.
                 else:
-                    _, best_move = eval('self.' + self.method + '(game, self.search_depth, maximizing_player)')
+                    self.new_root_search()
+                    _, best_move = search(game, self.search_depth, maximizing_player=True)
                     return best_move
 
             except Timeout:
                 # Handle any actions required at timeout, if necessary
+                if iteration is not None:
+                    self.report_iteration(iteration)
+                # The best move of the interrupted iteration is at least as good as the best
+                # move of the last completed iteration if the latter has been searched again.
+                if self.partial_results and self.partial_best is not None and \
+                        (self.root_move is None or self.root_move in self.partial_moves):
+                    return self.partial_best[1]
                 # Return the best move found in the last search iteration performed.
                 return best_move
 
         raise NotImplementedError
 
+    def start_pondering(self, game, move):
+        """Start searching, in the background, the position reached from
+        `game` by `move` and the predicted reply of the opponent (the best
+        move stored in the transposition table, or the reply scoring worst
+        for this player).
+        """
+        next_state = game.forecast_move(move)
+        replies = next_state.get_legal_moves()
+        if not replies:
+            return
+        reply = None
+        if self.tt is not None:
+            key, symmetry = self.tt_key(next_state)
+            entry = self.tt.probe(key)
+            if entry is not None:
+                reply = entry.move if symmetry is None else next_state.from_canonical(entry.move, symmetry)
+        if reply not in replies:
+            reply = min(replies, key=lambda candidate: self.score(next_state.forecast_move(candidate), self))
+        # The pondering process is restarted if it died (or if pondering was
+        # enabled after the player was created).
+        if self.ponderer is None or not self.ponderer.is_alive():
+            self.ponderer = Ponderer(self, self.ponder_limit)
+        self.ponderer.start(next_state.forecast_move(reply), (move, reply), export_entries(self.tt))
+
+    def finish_pondering(self, game):
+        """Stop pondering, merge the transposition table entries found while
+        pondering, and return the iterations completed while pondering if
+        `game` is the predicted position (None otherwise).
+        """
+        ponderer = self.ponderer
+        if ponderer is None or ponderer.moves is None:
+            return None
+        # The search stops within a few nodes, so the results are only waited
+        # for a few milliseconds.
+        result = ponderer.finish(min(RESULTS_WAIT, max(0., self.time_left() - self.TIMER_THRESHOLD)))
+        if result is None:
+            self.ponder_misses += 1
+            return None
+        iterations, entries = result
+        # The entries come deepest first, and the rest are dropped once the time
+        # left is needed by the search.
+        if self.tt is not None:
+            for start in range(0, len(entries), MERGE_CHUNK):
+                if self.time_left() < 2 * self.TIMER_THRESHOLD:
+                    break
+                self.tt.merge(entries[start:start + MERGE_CHUNK])
+        if ponderer.key != game.get_hash():
+            self.ponder_misses += 1
+            return None
+        self.ponder_hits += 1
+        return iterations
+
+    def parallel_search(self, game, legal_moves, best_move):
+        """Search `game` with root splitting: the legal moves are dealt to
+        `self.workers` processes, which each search `game` restricted to
+        their moves with `search_root`, until the time left reaches twice
+        `self.TIMER_THRESHOLD`. The best move is taken from the deepest
+        iteration completed by every worker which completed one.
+
+        This process waits for the results until the time left reaches
+        `self.TIMER_THRESHOLD`, and ignores the workers which have not
+        reported by then.
+
+        Returns
+        -------
+        tuple(int, int)
+            The best move found, or `best_move` if no worker completed an
+            iteration in time.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        deadline = time.time() + (self.time_left() - self.TIMER_THRESHOLD) / 1000
+        futures = [self.executor.submit(self.search_root, game, legal_moves[i::self.workers], deadline)
+                   for i in range(min(self.workers, len(legal_moves)))]
+        done, _ = wait(futures, timeout=max(0., self.time_left() - self.TIMER_THRESHOLD) / 1000)
+
+        results = []
+        for future in futures:
+            if future in done:
+                iterations, nodes = future.result()
+                self.nodes += nodes
+                # A worker which completed no iteration is ignored, like one
+                # which did not report in time.
+                if iterations:
+                    results.append(iterations)
+        if not results:
+            return best_move
+        # A proven outcome holds for every deeper iteration.
+        depth = min((len(iterations) for iterations in results if not math.isinf(iterations[-1][0])),
+                    default=None)
+        if depth is None:
+            depth = max(len(iterations) for iterations in results)
+        _, best_move = max((iterations[min(depth, len(iterations)) - 1] for iterations in results),
+                           key=lambda result: result[0])
+        return best_move
+
+    def search_root(self, game, root_moves, deadline, stop=None):
+        """Search `game` in a worker of a parallel search, with only the
+        given moves at the root (or all of them if None), until the time left
+        before `deadline` (in seconds since the epoch) reaches
+        `self.TIMER_THRESHOLD`, or until the event `stop` (if any) is set.
+
+        Returns
+        -------
+        list<(float, tuple(int, int))>
+            The score and best move of each completed iteration of iterative
+            deepening (of depths 1, 2, ...), or of the fixed-depth search.
+        int
+            The number of nodes searched.
+        """
+        self.time_left = lambda: 0. if stop is not None and stop.is_set() else (deadline - time.time()) * 1000
+        self.countdown = 1
+        self.root_moves = root_moves
+        self.nodes = 0
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.orderer is not None:
+            self.orderer.new_search()
+        self.root_move = None
+
+        search = getattr(self, self.method)
+        iterations = []
+        try:
+            if self.iterative:
+                depth = 1
+                score = None
+                while True:
+                    if self.time_left() < self.TIMER_THRESHOLD:
+                        raise Timeout()
+                    iteration = {'window': None, 'researches': 0}
+                    score, move = self.aspiration_search(search, game, depth, score, iteration)
+                    iterations.append((score, move))
+                    if self.endgame and math.isinf(score):
+                        break
+                    self.root_move = move
+                    depth += 1
+            else:
+                iterations.append(search(game, self.search_depth, maximizing_player=True))
+        except Timeout:
+            pass
+        return iterations, self.nodes
+
+    def check_timeout(self):
+        """Raise `Timeout` if the time left is below `self.TIMER_THRESHOLD`,
+        checking the time left once every `self.check_interval` calls.
+        """
+        self.countdown -= 1
+        if not self.countdown:
+            self.countdown = self.check_interval
+            if self.time_left() < self.TIMER_THRESHOLD:
+                raise Timeout()
+
+    def legal_moves(self, game):
+        """Return the legal moves to search in `game`: at the root of the
+        search of a worker of a parallel search, the moves of the worker.
+        """
+        if self.root_moves is not None and not self.ply:
+            return self.root_moves
+        return game.get_legal_moves()
+
+    def aspiration_search(self, search, game, depth, previous_score, iteration):
+        """Search `game` to the given depth from the root, with an aspiration
+        window centred on `previous_score` (the score of the previous
+        iteration, or None) if `self.aspiration` is set and the search method
+        supports windows. The window is widened on the failing side and the
+        search repeated until the score falls strictly inside it.
+
+        The final window and the number of re-searches are recorded in the
+        `iteration` statistics.
+
+        Returns
+        -------
+        float
+            The score of `game`
+        tuple(int, int)
+            The best move for `game`; (-1, -1) for no legal moves
+        """
+        alpha, beta = float("-inf"), float("inf")
+        if self.aspiration is None or self.method == 'minimax' or previous_score is None \
+                or math.isinf(previous_score):
+            iteration['window'] = (alpha, beta)
+            self.new_root_search()
+            return search(game, depth, maximizing_player=True)
+
+        lower_delta = upper_delta = self.aspiration
+        alpha, beta = previous_score - lower_delta, previous_score + upper_delta
+        while True:
+            iteration['window'] = (alpha, beta)
+            self.new_root_search()
+            score, move = search(game, depth, alpha, beta, maximizing_player=True)
+            if alpha < score < beta or (score <= alpha and alpha == float("-inf")) \
+                    or (score >= beta and beta == float("inf")):
+                return score, move
+            iteration['researches'] += 1
+            # The search failed low (resp. high): the score is an upper (resp. lower) bound,
+            # so widen the window beyond it.
+            if score <= alpha:
+                lower_delta *= self.aspiration_growth
+                alpha = score - lower_delta if not math.isinf(score) else float("-inf")
+            else:
+                upper_delta *= self.aspiration_growth
+                beta = score + upper_delta if not math.isinf(score) else float("inf")
+
+    def new_root_search(self):
+        """Forget the root moves recorded by the previous search."""
+        self.partial_moves = []
+        self.partial_best = None
+
+    def record_root_move(self, move, score, alpha):
+        """Record that the root move `move` has been fully searched by the
+        current search with the window (alpha, ...), and scored `score`, if
+        `self.partial_results` is set. Scores which are not above `alpha` are
+        only upper bounds, so the best move is only recorded once a move
+        scores above `alpha`.
+        """
+        if not self.partial_results:
+            return
+        self.partial_moves.append(move)
+        if score > alpha and (self.partial_best is None or score > self.partial_best[0]):
+            self.partial_best = (score, move)
+
+    def report_iteration(self, iteration):
+        """Complete the statistics of an iteration of iterative deepening and
+        pass them to `self.iteration_hook`, if any.
+        """
+        if self.iteration_hook is None:
+            return
+        iteration['nodes'] = self.nodes - iteration['nodes']
+        iteration['time'] = iteration['time'] - self.time_left()
+        self.iteration_hook(iteration)
+
+    def make_move(self, game, move):
+        """Return the game state reached by applying `move` to `game`, either
+        as a new board or, if `self.inplace` is set, by pushing the move on
+        `game` itself. Every call must be matched by a call to `unmake_move`.
+        """
+        self.ply += 1
+        if self.inplace:
+            game.push(move)
+            return game
+        return game.forecast_move(move)
+
+    def unmake_move(self, game):
+        """Revert the last move applied to `game` by `make_move`."""
+        self.ply -= 1
+        if self.inplace:
+            game.pop()
+
+    def tt_key(self, game):
+        """Return the key of `game` in the transposition table, which also
+        encodes the player from whose point of view the scores are computed,
+        and the index of the symmetry mapping `game` to the game state whose
+        moves are stored (None if the table is not keyed by canonical forms).
+        """
+        if self.tt_symmetry:
+            key, symmetry = game.get_canonical_form()
+        else:
+            key, symmetry = game.get_hash(), None
+        return (key if game.__player_1__ == self else key ^ PLAYER_2_PERSPECTIVE), symmetry
+
+    def probe_tt(self, game, depth, alpha, beta):
+        """Look up `game` in the transposition table before searching it to
+        the given depth with the window (alpha, beta).
+
+        Returns
+        -------
+        (int, int)
+            The key of `game` in the transposition table and its symmetry, as
+            returned by `tt_key` (None if there is no table, or at the root of
+            a worker searching only some of the moves), to be passed to
+            `store_tt` after the search.
+        tuple(int, int)
+            The best move found by a previous search of `game`, if any: the
+            stored move, or at the root the previous iteration's best move.
+        float, float
+            The search window, narrowed by the bound stored for `game`.
+        (float, tuple(int, int))
+            The score and move to return without searching `game`, or None
+            if `game` must be searched.
+        """
+        hash_move = self.root_move if not self.ply else None
+        # The entry of the root is the result of a search of all the moves, so
+        # it neither applies to nor may be replaced by a search of some of them.
+        if self.tt is None or (self.root_moves is not None and not self.ply):
+            return None, hash_move, alpha, beta, None
+
+        key = self.tt_key(game)
+        entry = self.tt.probe(key[0])
+        if entry is None:
+            return key, hash_move, alpha, beta, None
+
+        move = entry.move
+        if key[1] is not None and move != (-1, -1):
+            move = game.from_canonical(move, key[1])
+        if entry.depth >= depth:
+            if entry.flag == EXACT:
+                return key, move, alpha, beta, (entry.score, move)
+            elif entry.flag == LOWER:
+                alpha = max(alpha, entry.score)
+            else:
+                beta = min(beta, entry.score)
+            if beta <= alpha:
+                return key, move, alpha, beta, (entry.score, move)
+        return key, move, alpha, beta, None
+
+    def store_tt(self, game, key, depth, alpha, beta, best_score, best_move):
+        """Store the result of searching `game`, whose key was returned by
+        `probe_tt`, to the given depth with the window (alpha, beta) in the
+        transposition table.
+        """
+        if key is None:
+            return
+        key, symmetry = key
+        if symmetry is not None and best_move != (-1, -1):
+            best_move = game.to_canonical(best_move, symmetry)
+        if best_score <= alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, best_score, best_move)
+
+    def score_children(self, game, depth, legal_moves):
+        """Return the scores of the children of `game` for the given legal
+        moves if `game` is at the frontier of the search (i.e., at depth 1)
+        and `self.batch_score` is set, counting the children as searched
+        nodes. Otherwise, return None, and the children must be searched.
+        """
+        if depth != 1 or self.batch_score is None:
+            return None
+        self.nodes += len(legal_moves)
+        return self.batch_score(game, legal_moves, self)
+
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
         Parameters
@@ -333,11 +951,11 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        self.check_timeout()
+        self.nodes += 1
 
         no_legal_move = (-1, -1)
-        legal_moves = game.get_legal_moves()
+        legal_moves = self.legal_moves(game)
 
         if not depth or not legal_moves:
             return self.score(game, self), no_legal_move
@@ -345,15 +963,31 @@ class CustomPlayer:
         # The function to apply for choosing the best move depends on whether we are at a MAX or a MIN node.
         fn = max if maximizing_player else min
 
-        # If depth is 1, return the best next move.
+        scores = self.score_children(game, depth, legal_moves)
+        if scores is not None:
+            return fn(zip(scores, legal_moves))
+
+        results = []
+        for move in legal_moves:
+            next_state = self.make_move(game, move)
+            try:
+                # If depth is 1, score the next move (counting it as a searched node).
+                if depth == 1:
+                    self.nodes += 1
+                    results.append((self.score(next_state, self), move))
+                # If depth is greater than 1, recurse.
+                else:
+                    results.append((self.minimax(next_state, depth - 1, maximizing_player), move))
+            finally:
+                self.unmake_move(game)
+            if not self.ply and maximizing_player:
+                score = results[-1][0] if depth == 1 else results[-1][0][0]
+                self.record_root_move(move, score, float("-inf"))
+
         if depth == 1:
-            return fn((self.score(game.forecast_move(move), self), move) for move in legal_moves)
-        # If depth is greater than 1, recurse.
-        else:
-            (best_score, move), best_move = fn((self.minimax(game.forecast_move(move),
-                                                             depth - 1, maximizing_player), move) \
-                                               for move in legal_moves)
-            return best_score, best_move
+            return fn(results)
+        (best_score, move), best_move = fn(results)
+        return best_score, best_move
 
         raise NotImplementedError
 
@@ -387,15 +1021,21 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        self.check_timeout()
+        self.nodes += 1
 
         no_legal_move = (-1, -1)
-        legal_moves = game.get_legal_moves()
+        legal_moves = self.legal_moves(game)
 
         if not depth or not legal_moves:
             return self.score(game, self), no_legal_move
 
+        # Reuse the result of a previous search of the same state if it was at
+        # least as deep, either directly or to narrow the search window.
+        key, hash_move, alpha, beta, result = self.probe_tt(game, depth, alpha, beta)
+        if result is not None:
+            return result
+
         best_move = no_legal_move
         best_score = float("-inf") if maximizing_player else float("inf")
 
@@ -405,17 +1045,150 @@ class CustomPlayer:
         param = {'max': alpha, 'min': beta}
         fn = max if maximizing_player else min
 
+        if self.orderer is not None:
+            legal_moves = self.orderer.order(game, legal_moves, self.ply, hash_move)
+
+        scores = self.score_children(game, depth, legal_moves)
+
         # Expand node.
-        for legal_move in legal_moves:
-            score, move = self.alphabeta(game.forecast_move(legal_move), depth - 1,
-                                         param['max'], param['min'], not maximizing_player)
-            if comparison_op(score, best_score):
+        for index, legal_move in enumerate(legal_moves):
+            if scores is not None:
+                score = scores[index]
+            else:
+                next_state = self.make_move(game, legal_move)
+                try:
+                    score, move = self.alphabeta(next_state, depth - 1,
+                                                 param['max'], param['min'], not maximizing_player)
+                finally:
+                    self.unmake_move(game)
+            # Keep the first move if all moves score -inf (+inf at a MIN node), so that a
+            # proven loss still returns a legal move.
+            if comparison_op(score, best_score) or best_move == no_legal_move:
                 best_score, best_move = score, legal_move
+            if not self.ply and maximizing_player:
+                self.record_root_move(legal_move, score, alpha)
             # Update param (alpha if MAX, beta if MIN).
             param[max_or_min] = fn(param[max_or_min], best_score)
 
             if param['min'] <= param['max']:
+                if self.orderer is not None:
+                    self.orderer.record_cutoff(game, legal_move, self.ply, depth)
+                if self.profiler is not None:
+                    self.profiler.count('cutoffs')
                 break
+
+        self.store_tt(game, key, depth, alpha, beta, best_score, best_move)
         return best_score, best_move
 
         raise NotImplementedError
+
+    def pvs(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
+        """Implement principal variation search (NegaScout), a variant of
+        alpha-beta search which fully searches the first move of each node
+        and only tests whether the other moves are better, using a null
+        window. A move which passes the test is searched again with the full
+        window.
+
+        PVS returns the same score and move as `alphabeta` for the same move
+        order, and expands fewer nodes when the first move is usually the
+        best one, e.g. when it comes from the previous iteration of iterative
+        deepening through the transposition table or the move ordering.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+        alpha : float
+            Alpha limits the lower bound of search on minimizing layers
+        beta : float
+            Beta limits the upper bound of search on maximizing layers
+        maximizing_player : bool
+            Flag indicating whether the current search depth corresponds to a
+            maximizing layer (True) or a minimizing layer (False)
+        Returns
+        -------
+        float
+            The score for the current search branch
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        self.check_timeout()
+        self.nodes += 1
+
+        no_legal_move = (-1, -1)
+        legal_moves = self.legal_moves(game)
+
+        if not depth or not legal_moves:
+            return self.score(game, self), no_legal_move
+
+        key, hash_move, alpha, beta, result = self.probe_tt(game, depth, alpha, beta)
+        if result is not None:
+            return result
+
+        if self.orderer is not None:
+            legal_moves = self.orderer.order(game, legal_moves, self.ply, hash_move)
+        elif hash_move in legal_moves and legal_moves[0] != hash_move:
+            # The null window tests only pay off if the first move is usually
+            # the best one, so the previous best move is searched first even
+            # without move ordering.
+            legal_moves = list(legal_moves)
+            legal_moves.remove(hash_move)
+            legal_moves.insert(0, hash_move)
+
+        best_move = no_legal_move
+        best_score = float("-inf") if maximizing_player else float("inf")
+        lower, upper = alpha, beta
+
+        scores = self.score_children(game, depth, legal_moves)
+
+        for index, legal_move in enumerate(legal_moves):
+            if scores is not None:
+                # The scores of the children at the frontier are exact, so they need no test.
+                score = scores[index]
+            else:
+                next_state = self.make_move(game, legal_move)
+                try:
+                    if not index:
+                        score, _ = self.pvs(next_state, depth - 1, lower, upper, not maximizing_player)
+                    elif maximizing_player:
+                        # Test whether the move scores more than the best move so far...
+                        score, _ = self.pvs(next_state, depth - 1, lower, math.nextafter(lower, math.inf), False)
+                        # ... and if so, find out by how much. The test proved that the move
+                        # scores at least `score`, and scores of leaves are exact already.
+                        if depth > 1 and lower < score < upper:
+                            score, _ = self.pvs(next_state, depth - 1, score, upper, False)
+                    else:
+                        # Test whether the move scores less than the best move so far...
+                        score, _ = self.pvs(next_state, depth - 1, math.nextafter(upper, -math.inf), upper, True)
+                        # ... and if so, find out by how much. The test proved that the move
+                        # scores at most `score`, and scores of leaves are exact already.
+                        if depth > 1 and lower < score < upper:
+                            score, _ = self.pvs(next_state, depth - 1, lower, score, True)
+                finally:
+                    self.unmake_move(game)
+
+            # Keep the first move if all moves score -inf (+inf at a MIN node), as in `alphabeta`.
+            if maximizing_player:
+                if score > best_score or best_move == no_legal_move:
+                    best_score, best_move = score, legal_move
+                if not self.ply:
+                    self.record_root_move(legal_move, score, alpha)
+                lower = max(lower, best_score)
+            else:
+                if score < best_score or best_move == no_legal_move:
+                    best_score, best_move = score, legal_move
+                upper = min(upper, best_score)
+
+            if upper <= lower:
+                if self.orderer is not None:
+                    self.orderer.record_cutoff(game, legal_move, self.ply, depth)
+                if self.profiler is not None:
+                    self.profiler.count('cutoffs')
+                break
+
+        self.store_tt(game, key, depth, alpha, beta, best_score, best_move)
+        return best_score, best_move
@@ -0,0 +1,331 @@
+"""
+This file contains the `BitBoard` class, an alternative backend for the game
+Isolation which packs the blocked cells into a single integer bitmask instead
+of a list of lists.
+
+Cells are numbered row by row, so that the cell (row, col) has the index
+`row * width + col` and is represented by the bit `1 << index`. Player
+locations are kept as cell indices, and the legal moves of a player are found
+by masking a precomputed knight-move mask against the occupancy bitmask.
+
+`BitBoard` exposes the same public API as `isolation.Board`, so any player
+can be used on it unchanged.
+"""
+
+from .isolation import Board
+from .isolation import knight_move_table
+from .isolation import zobrist_keys
+
+
+# Knight-move masks, keyed by (width, height) and shared by all the boards
+# with the same geometry.
+_KNIGHT_TABLES = {}
+
+
+def knight_tables(width, height):
+    """
+    Return the knight-move tables for a board of the given size, computing
+    them on first use from `isolation.knight_move_table`.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (tuple<int>, tuple<tuple<(int, (int, int))>>)
+        For each cell index, the bitmask of the cells an L-shaped move away,
+        and the tuple of (bit, (row, column)) pairs for those same cells.
+    """
+    key = (width, height)
+    if key not in _KNIGHT_TABLES:
+        neighbors = knight_move_table(width, height)
+        masks = []
+        moves = []
+        for r in range(height):
+            for c in range(width):
+                cell_moves = tuple((1 << (nr * width + nc), (nr, nc)) for nr, nc in neighbors[(r, c)])
+                mask = 0
+                for bit, _ in cell_moves:
+                    mask |= bit
+                masks.append(mask)
+                moves.append(cell_moves)
+        _KNIGHT_TABLES[key] = (tuple(masks), tuple(moves))
+    return _KNIGHT_TABLES[key]
+
+
+class BitBoard(Board):
+    """
+    Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, storing the blocked cells as an integer bitmask.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__occupied__ = 0
+        self.__player_cells__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
+        self.__masks__, self.__moves__ = knight_tables(width, height)
+        self.__undo_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__hash_value__ = 0
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__occupied__ = self.__occupied__
+        new_board.__player_cells__ = dict(self.__player_cells__)
+        new_board.__hash_value__ = self.__hash_value__
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return self.move_is_on_board(move) and \
+               not self.__occupied__ >> (row * self.width + col) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        occupied = self.__occupied__
+        width = self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if not occupied >> (i * width + j) & 1]
+
+    def count_blank_spaces(self):
+        """
+        Return the number of locations that are still available on the board.
+        """
+        return self.width * self.height - bin(self.__occupied__).count("1")
+
+    def get_player_location(self, player):
+        """
+        Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the input player.
+        """
+        cell = self.__player_cells__[player]
+        if cell == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return divmod(cell, self.width)
+
+    def get_l_shaped_moves(self, player=None):
+        """
+        Return the list of all L-shaped moves for the specified player,
+        unconstrained by the current game state.
+        """
+        if player is None:
+            player = self.active_player
+        cell = self.__player_cells__[player]
+        if cell == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        return [mv for _, mv in self.__moves__[cell]]
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        cell = self.__player_cells__[player]
+        if cell == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        occupied = self.__occupied__
+        return [mv for bit, mv in self.__moves__[cell] if not occupied & bit]
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        cell = row * self.width + col
+        self.__update_hash__(self.__player_cells__[self.__active_player__], cell)
+        self.__player_cells__[self.__active_player__] = cell
+        self.__occupied__ |= 1 << cell
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def push(self, move):
+        """
+        Move the active player to a specified location, remembering enough
+        information to revert the move with `pop()`; see `Board.push`.
+        """
+        self.__undo_stack__.append(self.__player_cells__[self.__active_player__])
+        self.apply_move(move)
+
+    def pop(self):
+        """
+        Revert the last move applied with `push()`; see `Board.pop`.
+        """
+        previous_cell = self.__undo_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        cell = self.__player_cells__[self.__active_player__]
+        self.__update_hash__(previous_cell, cell)
+        self.__occupied__ &= ~(1 << cell)
+        self.__player_cells__[self.__active_player__] = previous_cell
+        self.move_count -= 1
+        return divmod(cell, self.width)
+
+    def get_hash(self):
+        """
+        Return the Zobrist hash of the current game state; see
+        `Board.get_hash`. Both backends hash the same state to the same value.
+        """
+        return self.__hash_value__
+
+    def __update_hash__(self, old_cell, new_cell):
+        """
+        Update the hash for the active player moving from `old_cell` to
+        `new_cell` and passing the initiative, or for the same move being
+        reverted (the update is its own inverse).
+        """
+        blocked, locations, side = self.__zobrist_keys__
+        player_keys = locations[0 if self.__active_player__ == self.__player_1__ else 1]
+        value = self.__hash_value__ ^ side ^ blocked[new_cell] ^ player_keys[new_cell]
+        if old_cell != Board.NOT_MOVED:
+            value ^= player_keys[old_cell]
+        self.__hash_value__ = value
+
+    def count_legal_moves(self, player=None):
+        """
+        Return the number of legal moves for the specified player; see
+        `Board.count_legal_moves`.
+        """
+        if player is None:
+            player = self.__active_player__
+        cell = self.__player_cells__[player]
+        if cell == Board.NOT_MOVED:
+            return self.count_blank_spaces()
+        return bin(self.__masks__[cell] & ~self.__occupied__).count("1")
+
+    def __has_moves__(self, player):
+        """ Test whether the specified player has at least one legal move. """
+        cell = self.__player_cells__[player]
+        if cell == Board.NOT_MOVED:
+            return self.__occupied__ != (1 << (self.width * self.height)) - 1
+        return bool(self.__masks__[cell] & ~self.__occupied__)
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self.__inactive_player__ and not self.__has_moves__(self.__active_player__)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self.__active_player__ and not self.__has_moves__(self.__active_player__)
+
+    def utility(self, player):
+        """
+        Returns the utility of the current game state from the perspective
+        of the specified player; see `Board.utility`.
+        """
+        if not self.__has_moves__(self.__active_player__):
+
+            if player == self.__inactive_player__:
+                return float("inf")
+
+            if player == self.__active_player__:
+                return float("-inf")
+
+        return 0.
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_cell = self.__player_cells__[self.__player_1__]
+        p2_cell = self.__player_cells__[self.__player_2__]
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+                cell = i * self.width + j
+
+                if not self.__occupied__ >> cell & 1:
+                    out += ' '
+                elif cell == p1_cell:
+                    out += '1'
+                elif cell == p2_cell:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
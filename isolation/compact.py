@@ -0,0 +1,404 @@
+"""
+This file contains the `CompactBoard` class, an alternative backend for the
+game Isolation which stores the game state in a few flat buffers, so that
+copying a board (e.g., in `forecast_move()`) is cheap and each search node
+uses little memory.
+
+Cells are numbered row by row, so that the cell (row, col) has the index
+`row * width + col`. The grid is a `bytearray` holding, for each cell, the
+symbol of the player who blocked it (or `Board.BLANK`), and the locations of
+the players are kept as cell indices in a list indexed by the player symbol
+minus one, instead of dictionaries keyed by the player objects.
+
+`CompactBoard` exposes the same public API as `isolation.Board`, so any
+player can be used on it unchanged. It does not derive from `Board`, so that
+its instances have no `__dict__`; the methods which do not depend on the
+representation of the game state are shared with `Board`.
+"""
+
+from .isolation import Board
+from .isolation import knight_move_table
+from .isolation import zobrist_keys
+
+
+# Knight-move tables over cell indices, keyed by (width, height) and shared
+# by all the boards with the same geometry.
+_CELL_TABLES = {}
+
+
+def cell_tables(width, height):
+    """
+    Return the knight-move tables for a board of the given size, computing
+    them on first use from `isolation.knight_move_table`.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (tuple<tuple<int>>, tuple<tuple<(int, (int, int))>>, bytes)
+        For each cell index, the tuple of the indices of the cells an
+        L-shaped move away, the tuple of (index, (row, column)) pairs for
+        those same cells, and the initial number of free neighbors of every
+        cell.
+    """
+    key = (width, height)
+    if key not in _CELL_TABLES:
+        neighbors = knight_move_table(width, height)
+        cells = [(r, c) for r in range(height) for c in range(width)]
+        moves = tuple(tuple((nr * width + nc, (nr, nc)) for nr, nc in neighbors[cell]) for cell in cells)
+        _CELL_TABLES[key] = (tuple(tuple(index for index, _ in cell_moves) for cell_moves in moves),
+                             moves,
+                             bytes(len(cell_moves) for cell_moves in moves))
+    return _CELL_TABLES[key]
+
+
+class CompactBoard(object):
+    """
+    Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, storing the game state in flat buffers.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+    __slots__ = ("width", "height", "move_count",
+                 "__player_1__", "__player_2__", "__active_player__", "__inactive_player__",
+                 "__player_symbols__", "__board_state__", "__last_player_move__",
+                 "__neighbors__", "__moves__", "__free_neighbors__", "__blank_count__",
+                 "__undo_stack__", "__zobrist_keys__", "__hash_value__", "__synced_state__")
+
+    BLANK = Board.BLANK
+    NOT_MOVED = Board.NOT_MOVED
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__board_state__ = bytearray(width * height)
+        self.__last_player_move__ = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self.__neighbors__, self.__moves__, free_neighbors = cell_tables(width, height)
+        self.__free_neighbors__ = bytearray(free_neighbors)
+        self.__blank_count__ = width * height
+        self.__undo_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__hash_value__ = 0
+        self.__synced_state__ = self.__board_state__
+
+    # The methods which only use the public API are shared with `Board`.
+    active_player = Board.active_player
+    inactive_player = Board.inactive_player
+    get_opponent = Board.get_opponent
+    forecast_move = Board.forecast_move
+    move_is_on_board = Board.move_is_on_board
+    print_board = Board.print_board
+    play = Board.play
+    get_canonical_form = Board.get_canonical_form
+    get_canonical_hash = Board.get_canonical_hash
+    to_canonical = Board.to_canonical
+    from_canonical = Board.from_canonical
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        self.__sync__()
+        new_board = CompactBoard.__new__(CompactBoard)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__player_symbols__ = self.__player_symbols__
+        new_board.__board_state__ = self.__board_state__[:]
+        new_board.__last_player_move__ = self.__last_player_move__[:]
+        new_board.__neighbors__ = self.__neighbors__
+        new_board.__moves__ = self.__moves__
+        new_board.__free_neighbors__ = self.__free_neighbors__[:]
+        new_board.__blank_count__ = self.__blank_count__
+        new_board.__undo_stack__ = []
+        new_board.__zobrist_keys__ = self.__zobrist_keys__
+        new_board.__hash_value__ = self.__hash_value__
+        new_board.__synced_state__ = new_board.__board_state__
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return self.move_is_on_board(move) and \
+               self.__board_state__[row * self.width + col] == Board.BLANK
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        board_state = self.__board_state__
+        width = self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if board_state[i * width + j] == Board.BLANK]
+
+    def count_blank_spaces(self):
+        """
+        Return the number of locations that are still available on the board;
+        see `Board.count_blank_spaces`.
+        """
+        self.__sync__()
+        return self.__blank_count__
+
+    def get_player_location(self, player):
+        """
+        Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the input player.
+        """
+        cell = self.__last_player_move__[self.__player_symbols__[player] - 1]
+        if cell == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return divmod(cell, self.width)
+
+    def get_l_shaped_moves(self, player=None):
+        """
+        Return the list of all L-shaped moves for the specified player,
+        unconstrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        cell = self.__last_player_move__[self.__player_symbols__[player] - 1]
+        if cell == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        return [mv for _, mv in self.__moves__[cell]]
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        cell = self.__last_player_move__[self.__player_symbols__[player] - 1]
+        if cell == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        board_state = self.__board_state__
+        return [mv for index, mv in self.__moves__[cell] if board_state[index] == Board.BLANK]
+
+    def count_legal_moves(self, player=None):
+        """
+        Return the number of legal moves for the specified player; see
+        `Board.count_legal_moves`.
+        """
+        if player is None:
+            player = self.__active_player__
+        self.__sync__()
+        cell = self.__last_player_move__[self.__player_symbols__[player] - 1]
+        if cell == Board.NOT_MOVED:
+            return self.__blank_count__
+        return self.__free_neighbors__[cell]
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        cell = row * self.width + col
+        symbol = self.__player_symbols__[self.__active_player__]
+        self.__update_hash__(symbol, self.__last_player_move__[symbol - 1], cell)
+        free_neighbors = self.__free_neighbors__
+        for index in self.__neighbors__[cell]:
+            free_neighbors[index] -= 1
+        self.__blank_count__ -= 1
+        self.__last_player_move__[symbol - 1] = cell
+        self.__board_state__[cell] = symbol
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def push(self, move):
+        """
+        Move the active player to a specified location, remembering enough
+        information to revert the move with `pop()`; see `Board.push`.
+        """
+        self.__undo_stack__.append(self.__last_player_move__[self.__player_symbols__[self.__active_player__] - 1])
+        self.apply_move(move)
+
+    def pop(self):
+        """
+        Revert the last move applied with `push()`; see `Board.pop`.
+        """
+        previous_cell = self.__undo_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        symbol = self.__player_symbols__[self.__active_player__]
+        cell = self.__last_player_move__[symbol - 1]
+        self.__update_hash__(symbol, previous_cell, cell)
+        free_neighbors = self.__free_neighbors__
+        for index in self.__neighbors__[cell]:
+            free_neighbors[index] += 1
+        self.__blank_count__ += 1
+        self.__board_state__[cell] = Board.BLANK
+        self.__last_player_move__[symbol - 1] = previous_cell
+        self.move_count -= 1
+        return divmod(cell, self.width)
+
+    def get_hash(self):
+        """
+        Return the Zobrist hash of the current game state; see
+        `Board.get_hash`. All the backends hash the same state to the same
+        value.
+        """
+        self.__sync__()
+        return self.__hash_value__
+
+    def __sync__(self):
+        """
+        Recompute the incrementally maintained state if the grid has been
+        replaced since it was last computed (e.g., by the `copy()` method of
+        a subclass).
+        """
+        if self.__synced_state__ is not self.__board_state__:
+            self.__resync__()
+
+    def __resync__(self):
+        """ Compute the hash, the free neighbor counts and the blank count from scratch. """
+        blocked, locations, side = self.__zobrist_keys__
+        board_state = self.__board_state__
+        value = 0
+        for index, symbol in enumerate(board_state):
+            if symbol != Board.BLANK:
+                value ^= blocked[index]
+        for index, cell in enumerate(self.__last_player_move__):
+            if cell != Board.NOT_MOVED:
+                value ^= locations[index][cell]
+        if self.__active_player__ == self.__player_2__:
+            value ^= side
+        self.__hash_value__ = value
+        self.__free_neighbors__ = bytearray(sum(1 for index in cell_neighbors if board_state[index] == Board.BLANK)
+                                            for cell_neighbors in self.__neighbors__)
+        self.__blank_count__ = board_state.count(Board.BLANK)
+        self.__synced_state__ = board_state
+
+    def __update_hash__(self, symbol, old_cell, new_cell):
+        """
+        Update the hash for the player with the given symbol moving from
+        `old_cell` to `new_cell` and passing the initiative, or for the same
+        move being reverted (the update is its own inverse).
+        """
+        blocked, locations, side = self.__zobrist_keys__
+        player_keys = locations[symbol - 1]
+        value = self.__hash_value__ ^ side ^ blocked[new_cell] ^ player_keys[new_cell]
+        if old_cell != Board.NOT_MOVED:
+            value ^= player_keys[old_cell]
+        self.__hash_value__ = value
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self.__inactive_player__ and not self.count_legal_moves(self.__active_player__)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self.__active_player__ and not self.count_legal_moves(self.__active_player__)
+
+    def utility(self, player):
+        """
+        Returns the utility of the current game state from the perspective
+        of the specified player; see `Board.utility`.
+        """
+        if not self.count_legal_moves(self.__active_player__):
+
+            if player == self.__inactive_player__:
+                return float("inf")
+
+            if player == self.__active_player__:
+                return float("-inf")
+
+        return 0.
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_cell, p2_cell = self.__last_player_move__
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+                cell = i * self.width + j
+
+                if not self.__board_state__[cell]:
+                    out += ' '
+                elif cell == p1_cell:
+                    out += '1'
+                elif cell == p2_cell:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
@@ -8,14 +8,139 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
-from copy import deepcopy
 from copy import copy
 
 
 TIME_LIMIT_MILLIS = 200
 
+# Offsets of the L-shaped moves (like a knight in chess).
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+# Knight-move neighbor tables, keyed by (width, height) and shared by all the
+# boards with the same geometry.
+_NEIGHBOR_TABLES = {}
+
+
+def knight_move_table(width, height):
+    """
+    Return the knight-move neighbor table for a board of the given size,
+    computing it on first use.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    dict<(int, int), tuple<(int, int)>>
+        A dictionary mapping each coordinate pair (row, column) on the board
+        to the tuple of the cells placed in an L-shape with respect to it,
+        in the order given by `DIRECTIONS`.
+    """
+    key = (width, height)
+    if key not in _NEIGHBOR_TABLES:
+        _NEIGHBOR_TABLES[key] = {(r, c): tuple((r + dr, c + dc) for dr, dc in DIRECTIONS
+                                               if 0 <= r + dr < height and 0 <= c + dc < width)
+                                 for r in range(height) for c in range(width)}
+    return _NEIGHBOR_TABLES[key]
+
+
+# Zobrist keys, keyed by (width, height) and shared by all the boards with the
+# same geometry. The keys are drawn from a fixed seed so that hashes are
+# reproducible across runs and processes.
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """
+    Return the random keys used to hash the states of a board of the given
+    size, computing them on first use.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (tuple<int>, (tuple<int>, tuple<int>), int)
+        For each cell index (i.e., `row * width + col`), the key of the cell
+        being blocked; for each player (player 1, then player 2) and cell
+        index, the key of the player standing on the cell; and the key of
+        player 2 holding the initiative.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_KEYS:
+        rng = random.Random(width * 65536 + height)
+        num_cells = width * height
+        blocked = tuple(rng.getrandbits(64) for _ in range(num_cells))
+        locations = tuple(tuple(rng.getrandbits(64) for _ in range(num_cells)) for _ in range(2))
+        _ZOBRIST_KEYS[key] = (blocked, locations, rng.getrandbits(64))
+    return _ZOBRIST_KEYS[key]
+
+
+# Symmetries of the boards, keyed by (width, height).
+_SYMMETRY_TABLES = {}
+
+
+def symmetry_tables(width, height):
+    """
+    Return the symmetries of a board of the given size, i.e. the rotations
+    and reflections which map the board onto itself and preserve L-shaped
+    moves: the identity, the two reflections and the half turn, plus, on
+    square boards, the two diagonal reflections and the two quarter turns.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    (tuple<tuple<int>>, tuple<tuple<int>>)
+        For each symmetry, the index (i.e., `row * width + col`) of the image
+        of each cell, and the index of the preimage of each cell.
+    """
+    key = (width, height)
+    if key not in _SYMMETRY_TABLES:
+        maps = [lambda r, c: (r, c),
+                lambda r, c: (height - 1 - r, c),
+                lambda r, c: (r, width - 1 - c),
+                lambda r, c: (height - 1 - r, width - 1 - c)]
+        if width == height:
+            maps += [lambda r, c: (c, r),
+                     lambda r, c: (width - 1 - c, height - 1 - r),
+                     lambda r, c: (c, height - 1 - r),
+                     lambda r, c: (width - 1 - c, r)]
+        images = []
+        preimages = []
+        for f in maps:
+            image = [0] * (width * height)
+            preimage = [0] * (width * height)
+            for r in range(height):
+                for c in range(width):
+                    nr, nc = f(r, c)
+                    image[r * width + c] = nr * width + nc
+                    preimage[nr * width + nc] = r * width + c
+            images.append(tuple(image))
+            preimages.append(tuple(preimage))
+        _SYMMETRY_TABLES[key] = (tuple(images), tuple(preimages))
+    return _SYMMETRY_TABLES[key]
+
 
 class Board(object):
     """
@@ -52,6 +177,14 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__neighbors__ = knight_move_table(width, height)
+        self.__undo_stack__ = []
+        self.__zobrist_keys__ = zobrist_keys(width, height)
+        self.__hash_value__ = 0
+        self.__free_neighbors__ = [[len(self.__neighbors__[(i, j)]) for j in range(width)] for i in range(height)]
+        self.__cells__ = tuple((i, j) for j in range(width) for i in range(height))
+        self.__blank_spaces__ = set(self.__cells__)
+        self.__synced_state__ = self.__board_state__
 
     @property
     def active_player(self):
@@ -93,13 +226,29 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        self.__sync__()
+        # The board is built without `__init__()`, which would compute the
+        # derived state of an empty board only for it to be replaced: the
+        # tables of the geometry are shared, and the mutable state is copied.
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
         new_board.__active_player__ = self.__active_player__
         new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__board_state__ = [row[:] for row in self.__board_state__]
         new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__player_symbols__ = self.__player_symbols__
+        new_board.__neighbors__ = self.__neighbors__
+        new_board.__undo_stack__ = []
+        new_board.__zobrist_keys__ = self.__zobrist_keys__
+        new_board.__hash_value__ = self.__hash_value__
+        new_board.__free_neighbors__ = [row[:] for row in self.__free_neighbors__]
+        new_board.__cells__ = self.__cells__
+        new_board.__blank_spaces__ = set(self.__blank_spaces__)
+        new_board.__synced_state__ = new_board.__board_state__
         return new_board
 
     def forecast_move(self, move):
@@ -172,8 +321,20 @@ class Board(object):
         """
         Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-            if self.__board_state__[i][j] == Board.BLANK]
+        self.__sync__()
+        blank_spaces = self.__blank_spaces__
+        return [cell for cell in self.__cells__ if cell in blank_spaces]
+
+    def count_blank_spaces(self):
+        """
+        Return the number of locations that are still available on the board,
+        i.e. `len(self.get_blank_spaces())`, without building the list.
+
+        The set of blank cells is maintained incrementally by `apply_move()`
+        and `pop()`, so this is a constant-time lookup.
+        """
+        self.__sync__()
+        return len(self.__blank_spaces__)
 
     def get_player_location(self, player):
         """
@@ -248,18 +409,217 @@ class Board(object):
         None
         """
         row, col = move
+        self.__update_hash__(self.__last_player_move__[self.active_player], move)
+        for r, c in self.__neighbors__[move]:
+            self.__free_neighbors__[r][c] -= 1
+        self.__blank_spaces__.discard(move)
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def push(self, move):
+        """
+        Move the active player to a specified location, remembering enough
+        information to revert the move with `pop()`. Unlike `forecast_move()`,
+        this changes the calling object and does not allocate a new board.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        self.__undo_stack__.append(self.__last_player_move__[self.__active_player__])
+        self.apply_move(move)
+
+    def pop(self):
+        """
+        Revert the last move applied with `push()`, restoring the active
+        player, the player locations and the move count.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the reverted move.
+        """
+        previous_move = self.__undo_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.__last_player_move__[self.__active_player__]
+        self.__update_hash__(previous_move, move)
+        for r, c in self.__neighbors__[move]:
+            self.__free_neighbors__[r][c] += 1
+        self.__blank_spaces__.add(move)
+        row, col = move
+        self.__board_state__[row][col] = Board.BLANK
+        self.__last_player_move__[self.__active_player__] = previous_move
+        self.move_count -= 1
+        return move
+
+    def get_hash(self):
+        """
+        Return the Zobrist hash of the current game state, which encodes the
+        blocked cells, the location of each player and the player holding
+        the initiative.
+
+        The hash is maintained incrementally by `apply_move()` and `pop()`,
+        and recomputed from scratch if the board state has been replaced
+        (e.g., by the `copy()` method of a subclass).
+
+        Returns
+        ----------
+        int
+            A 64-bit hash of the current game state.
+        """
+        self.__sync__()
+        return self.__hash_value__
+
+    def get_canonical_form(self):
+        """
+        Return the canonical form of the current game state, i.e. the image
+        of the game state with the smallest hash among its images by the
+        symmetries of the board (see `symmetry_tables`). Symmetric game
+        states have the same value and the same canonical form, so caches
+        keyed by the canonical hash hold up to 8 times more game states.
+
+        Returns
+        ----------
+        (int, int)
+            The hash of the canonical form (i.e., the value `get_hash()`
+            would return on it), and the index of the symmetry mapping the
+            current game state to its canonical form, to be passed to
+            `to_canonical()` and `from_canonical()`.
+        """
+        width = self.width
+        blank_spaces = set(self.get_blank_spaces())
+        occupied = [r * width + c for r in range(self.height) for c in range(width) if (r, c) not in blank_spaces]
+        locations = []
+        for index, player in enumerate((self.__player_1__, self.__player_2__)):
+            location = self.get_player_location(player)
+            if location != Board.NOT_MOVED:
+                locations.append((index, location[0] * width + location[1]))
+        blocked, player_keys, side = self.__zobrist_keys__
+        initial = side if self.__active_player__ == self.__player_2__ else 0
+
+        best = None
+        for symmetry, image in enumerate(symmetry_tables(width, self.height)[0]):
+            value = initial
+            for cell in occupied:
+                value ^= blocked[image[cell]]
+            for index, cell in locations:
+                value ^= player_keys[index][image[cell]]
+            if best is None or value < best[0]:
+                best = (value, symmetry)
+        return best
+
+    def get_canonical_hash(self):
+        """
+        Return the hash of the canonical form of the current game state; see
+        `get_canonical_form()`.
+        """
+        return self.get_canonical_form()[0]
+
+    def to_canonical(self, move, symmetry):
+        """
+        Map a move in the current game state to the same move in its
+        canonical form, given the symmetry returned by `get_canonical_form()`.
+        """
+        row, col = move
+        return divmod(symmetry_tables(self.width, self.height)[0][symmetry][row * self.width + col], self.width)
+
+    def from_canonical(self, move, symmetry):
+        """
+        Map a move in the canonical form of the current game state back to
+        the same move in the current game state; the inverse of
+        `to_canonical()`.
+        """
+        row, col = move
+        return divmod(symmetry_tables(self.width, self.height)[1][symmetry][row * self.width + col], self.width)
+
+    def count_legal_moves(self, player=None):
+        """
+        Return the number of legal moves for the specified player, i.e.
+        `len(self.get_legal_moves(player))`, without building the list.
+
+        The number of blank cells a knight's move away from each cell is
+        maintained incrementally by `apply_move()` and `pop()`, so this is a
+        constant-time lookup once the player has moved.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the number of legal moves for the active player on the
+            board.
+
+        Returns
+        ----------
+        int
+            The number of legal moves for the player.
+        """
+        if player is None:
+            player = self.active_player
+        self.__sync__()
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return len(self.__blank_spaces__)
+        return self.__free_neighbors__[location[0]][location[1]]
+
+    def __sync__(self):
+        """
+        Recompute the incrementally maintained state (the hash, the free
+        neighbor counts and the blank cells) if the board state has been replaced since it was
+        last computed.
+        """
+        if self.__synced_state__ is not self.__board_state__:
+            self.__resync__()
+
+    def __resync__(self):
+        """ Compute the hash, the free neighbor counts and the blank cells from scratch. """
+        blocked, locations, side = self.__zobrist_keys__
+        value = 0
+        for i in range(self.height):
+            for j in range(self.width):
+                if self.__board_state__[i][j] != Board.BLANK:
+                    value ^= blocked[i * self.width + j]
+        for index, player in enumerate((self.__player_1__, self.__player_2__)):
+            location = self.__last_player_move__[player]
+            if location != Board.NOT_MOVED:
+                value ^= locations[index][location[0] * self.width + location[1]]
+        if self.__active_player__ == self.__player_2__:
+            value ^= side
+        self.__hash_value__ = value
+        self.__free_neighbors__ = [[sum(1 for r, c in self.__neighbors__[(i, j)]
+                                        if self.__board_state__[r][c] == Board.BLANK)
+                                    for j in range(self.width)] for i in range(self.height)]
+        self.__blank_spaces__ = set((i, j) for i, j in self.__cells__ if self.__board_state__[i][j] == Board.BLANK)
+        self.__synced_state__ = self.__board_state__
+
+    def __update_hash__(self, old_location, new_location):
+        """
+        Update the hash for the active player moving from `old_location` to
+        `new_location` and passing the initiative, or for the same move being
+        reverted (the update is its own inverse).
+        """
+        blocked, locations, side = self.__zobrist_keys__
+        player_keys = locations[self.__player_symbols__[self.__active_player__] - 1]
+        new_cell = new_location[0] * self.width + new_location[1]
+        value = self.__hash_value__ ^ side ^ blocked[new_cell] ^ player_keys[new_cell]
+        if old_location != Board.NOT_MOVED:
+            value ^= player_keys[old_location[0] * self.width + old_location[1]]
+        self.__hash_value__ = value
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self.inactive_player and not self.get_legal_moves(self.active_player)
+        return player == self.inactive_player and not self.count_legal_moves(self.active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self.active_player and not self.get_legal_moves(self.active_player)
+        return player == self.active_player and not self.count_legal_moves(self.active_player)
 
     def utility(self, player):
         """
@@ -285,7 +645,7 @@ class Board(object):
             otherwise.
         """
 
-        if not self.get_legal_moves(self.active_player):
+        if not self.count_legal_moves(self.active_player):
 
             if player == self.inactive_player:
                 return float("inf")
@@ -304,14 +664,7 @@ class Board(object):
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
-
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_on_board((r+dr, c+dc))]
-
-        return moves
+        return list(self.__neighbors__[move])
 
 
     def __get_moves__(self, move):
@@ -319,17 +672,11 @@ class Board(object):
         Generate the list of possible (i.e. valid) moves for an L-shaped motion (like a knight in chess).
         """
 
-        # if move == Board.NOT_MOVED:
-        #     return self.get_blank_spaces()
-        #
-        # r, c = move
-        #
-        # directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-        #               (1, -2),  (1, 2), (2, -1),  (2, 1)]
-        #
-        # valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
 
-        valid_moves = [mv for mv in self.__get_all_moves__(move) if self.move_is_legal(mv)]
+        board_state = self.__board_state__
+        valid_moves = [(r, c) for r, c in self.__neighbors__[move] if board_state[r][c] == Board.BLANK]
 
         return valid_moves
 
@@ -0,0 +1,245 @@
+"""This file contains a Monte Carlo tree search (MCTS) player, which grows a
+game tree with the UCT selection rule and estimates the value of its nodes
+by playing random (or heuristic-guided) games to the end. Unlike
+`CustomPlayer`, it needs no evaluation function and can be stopped at any
+time, so it plays as many simulations as its time allows.
+
+The tree is kept between consecutive moves of a game: when asked for a move,
+the player looks up the position in the subtree reached by its own last move
+and the reply of its opponent, and reuses the statistics gathered there.
+"""
+
+import gc
+import math
+import random
+
+EXPLORATION = math.sqrt(2)  # UCT exploration constant
+
+
+class Node:
+    """A node of the search tree, i.e. a game state reached by `move` from
+    the game state of its parent. Nodes do not refer to their parent, so the
+    tree has no reference cycles and is freed as soon as it is dropped.
+
+    The statistics of a node are from the point of view of the player who
+    made `move`: `wins` counts the simulations through the node won by that
+    player, out of `visits`.
+    """
+
+    __slots__ = ('move', 'children', 'untried', 'visits', 'wins', 'key')
+
+    def __init__(self, move, legal_moves, key):
+        self.move = move
+        self.children = []
+        # Moves are expanded in a random order.
+        random.shuffle(legal_moves)
+        self.untried = legal_moves
+        self.visits = 0
+        self.wins = 0
+        # The hash of the game state, used to check reused subtrees.
+        self.key = key
+
+    def select(self, exploration):
+        """Return the child maximizing the UCT score."""
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo tree search
+    and the UCT selection rule.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of the UCT score of a child, i.e.
+        `wins / visits + exploration * sqrt(log(parent visits) / visits)`.
+
+    rollout_score_fn : callable (optional)
+        A heuristic evaluation function (e.g., `sample_players.improved_score`)
+        guiding the simulations: each simulated move is the one scoring best
+        for the player making it, with ties broken at random. If None, the
+        simulated moves are chosen uniformly at random, which is much faster.
+
+    reuse_tree : boolean (optional)
+        Flag indicating whether the search tree is kept between consecutive
+        moves of a game.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is stopped. Should be a
+        positive value large enough to allow the function to return before
+        the timer expires.
+    """
+
+    def __init__(self, exploration=EXPLORATION, rollout_score_fn=None, reuse_tree=True, timeout=15.):
+        self.exploration = exploration
+        self.rollout_score = rollout_score_fn
+        self.reuse_tree = reuse_tree
+        self.time_left = None
+        self.TIMER_THRESHOLD = timeout
+        self.root = None
+        self.simulations = 0
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves until the
+        time limit is close, and return the most visited move.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells). The search
+            applies and reverts moves on it with `push()` and `pop()`.
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to a legal move; may return
+            (-1, -1) if there are no available legal moves.
+
+        Notes
+        -----
+            After the search, `self.simulations` holds the number of
+            simulations played for this move, and `self.root` the root of the
+            search tree, whose `visits` include the simulations reused from
+            the previous moves.
+        """
+        self.time_left = time_left
+        if not legal_moves:
+            self.root = None
+            return (-1, -1)
+
+        root = self.reused_root(game) if self.reuse_tree else None
+        if root is None:
+            root = Node(None, list(legal_moves), game.get_hash())
+        root.move = None
+        self.root = root
+
+        # The search allocates many long-lived nodes, which trigger full
+        # collections of the cyclic garbage collector lasting longer than
+        # the timer threshold, so the collector is paused while searching
+        # (the tree has no reference cycles).
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self.simulations = 0
+            while self.time_left() > self.TIMER_THRESHOLD:
+                self.simulate(game, root)
+                self.simulations += 1
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+        if not root.children:
+            return legal_moves[0]
+        return max(root.children, key=lambda child: child.visits).move
+
+    def reused_root(self, game):
+        """Return the node of the previous search tree holding `game`, i.e.
+        the grandchild of the previous root reached by the last move of this
+        player and the reply of its opponent, or None if it was not expanded.
+        """
+        node = self.root
+        if node is None:
+            return None
+        for player in (self, game.inactive_player):
+            move = game.get_player_location(player)
+            node = next((child for child in node.children if child.move == move), None)
+            if node is None:
+                return None
+        return node if node.key == game.get_hash() else None
+
+    def simulate(self, game, root):
+        """Run one iteration of the search from `root`, the node holding
+        `game`: select a leaf with the UCT rule, expand one of its moves,
+        play a simulation to the end of the game from the new node, and
+        update the statistics of the nodes on its path. `game` is restored
+        before returning.
+        """
+        node = root
+        path = [root]
+        plies = 0
+        try:
+            # Selection
+            while not node.untried and node.children:
+                node = node.select(self.exploration)
+                path.append(node)
+                game.push(node.move)
+                plies += 1
+
+            # Expansion
+            if node.untried:
+                move = node.untried.pop()
+                game.push(move)
+                plies += 1
+                child = Node(move, game.get_legal_moves(), game.get_hash())
+                node.children.append(child)
+                path.append(child)
+                legal_moves = list(child.untried)
+            else:
+                # Terminal node
+                legal_moves = []
+
+            # Simulation
+            rollout_plies = self.rollout(game, legal_moves)
+        finally:
+            for _ in range(plies):
+                game.pop()
+
+        # Backpropagation: the player to move at the end of the simulation
+        # lost, so the player who moved into the leaf won if the simulation
+        # had an even number of plies.
+        reward = 1 if rollout_plies % 2 == 0 else 0
+        for node in reversed(path):
+            node.visits += 1
+            node.wins += reward
+            reward = 1 - reward
+
+    def rollout(self, game, legal_moves):
+        """Play `game` to the end from a state with the given legal moves,
+        and return the number of moves played. The simulated moves are
+        reverted before returning, even if the simulation is interrupted
+        (e.g., by an exception raised by `self.rollout_score`).
+        """
+        plies = 0
+        try:
+            while legal_moves:
+                if self.rollout_score is None:
+                    move = random.choice(legal_moves)
+                else:
+                    move = self.best_rollout_move(game, legal_moves)
+                game.push(move)
+                plies += 1
+                legal_moves = game.get_legal_moves()
+        finally:
+            for _ in range(plies):
+                game.pop()
+        return plies
+
+    def best_rollout_move(self, game, legal_moves):
+        """Return the move scoring best for the active player of `game` with
+        `self.rollout_score`, breaking ties at random.
+        """
+        player = game.active_player
+        best_score, best_moves = float("-inf"), []
+        for move in legal_moves:
+            game.push(move)
+            try:
+                score = self.rollout_score(game, player)
+            finally:
+                game.pop()
+            if score > best_score:
+                best_score, best_moves = score, [move]
+            elif score == best_score:
+                best_moves.append(move)
+        return random.choice(best_moves)
@@ -0,0 +1,104 @@
+"""This file contains the move ordering used by `CustomPlayer` to expand the
+most promising moves first during alpha-beta search, so that more branches
+are pruned.
+"""
+
+from isolation import knight_move_table
+
+
+# Components of the move ordering, in decreasing order of priority.
+COMPONENTS = ('hash', 'killers', 'history', 'mobility')
+
+
+class MoveOrderer:
+    """Order the legal moves of a game state by trying, in this order:
+
+    - 'hash': the best move found by a previous search of the same state
+      (i.e., the principal variation move of the previous iteration, as
+      provided by the caller);
+    - 'killers': the moves which caused a cutoff in a sibling state, i.e.
+      at the same ply of the search tree;
+    - 'history': the moves with the best record of causing cutoffs for the
+      same player anywhere in the tree, weighted by the searched depth;
+    - 'mobility': the moves leading to the cells with the most open moves.
+
+    Moves which no enabled component tells apart keep their generation order.
+
+    Parameters
+    ----------
+    components : iterable<str> (optional)
+        The names of the enabled components, among `COMPONENTS`.
+
+    num_killers : int (optional)
+        The number of killer moves remembered for each ply.
+    """
+
+    def __init__(self, components=COMPONENTS, num_killers=2):
+        components = set(components)
+        unknown = components.difference(COMPONENTS)
+        if unknown:
+            raise ValueError("Unknown move ordering components: {}".format(sorted(unknown)))
+        self.use_hash = 'hash' in components
+        self.use_killers = 'killers' in components
+        self.use_history = 'history' in components
+        self.use_mobility = 'mobility' in components
+        self.num_killers = num_killers
+        self.killers = {}
+        self.history = {}
+
+    def new_search(self):
+        """Prepare for the search of a new move: forget the killer moves,
+        whose plies no longer match, and age the history scores.
+        """
+        self.killers = {}
+        self.history = {key: value // 2 for key, value in self.history.items() if value > 1}
+
+    def order(self, game, moves, ply, hash_move=None):
+        """Return the moves sorted from the most to the least promising.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state in which the moves are legal.
+
+        moves : list<(int, int)>
+            The legal moves of the active player.
+
+        ply : int
+            The distance (in plies) from the root of the search to `game`.
+
+        hash_move : (int, int) (optional)
+            The best move found by a previous search of `game`, if any.
+
+        Returns
+        -------
+        list<(int, int)>
+            The same moves, in the order in which they should be searched.
+        """
+        killers = self.killers.get(ply, ()) if self.use_killers else ()
+        player = game.active_player
+        history = self.history if self.use_history else {}
+        neighbors = knight_move_table(game.width, game.height) if self.use_mobility else {}
+        if not self.use_hash:
+            hash_move = None
+
+        def priority(move):
+            killer_rank = len(killers) - killers.index(move) if move in killers else 0
+            mobility = sum(1 for cell in neighbors.get(move, ()) if game.move_is_legal(cell))
+            return (move == hash_move, killer_rank, history.get((player, move), 0), mobility)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def record_cutoff(self, game, move, ply, depth):
+        """Record that searching `move` in `game` at the given ply and depth
+        caused a cutoff.
+        """
+        if self.use_killers:
+            killers = self.killers.setdefault(ply, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.num_killers:]
+        if self.use_history:
+            key = (game.active_player, move)
+            self.history[key] = self.history.get(key, 0) + depth * depth
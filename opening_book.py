@@ -0,0 +1,245 @@
+"""
+Build an opening book for `CustomPlayer`: search every position reachable in
+at most a given number of plies from the empty board with fixed-depth
+alpha-beta search, and save the best move of each position to a file which
+`OpeningBook` loads almost instantly.
+
+Positions which are symmetric to each other (by the rotations and
+reflections of the board which map the board onto itself) have the same
+value, so only one canonical representative of each class of symmetric
+positions is searched and stored.
+
+The book is a binary file made of a header (see `HEADER`), followed by the
+sorted keys of the canonical positions as little-endian unsigned 64-bit
+integers, and by the best move of each position as a cell index of one byte.
+A key packs the blocked cells of the position as a bitmask, followed by the
+locations of the active and the inactive player (6 bits each). The file is
+memory-mapped and searched by bisection, so it is never read as a whole.
+"""
+
+import argparse
+import mmap
+import struct
+import timeit
+
+from game_agent import CustomPlayer
+from game_agent import custom_score
+from isolation import Board
+from isolation import symmetry_tables
+
+MAGIC = b"ISOBOOK2"
+
+# Magic number, width, height, number of plies and search depth of the book,
+# and number of positions.
+HEADER = struct.Struct("<8sBBBBI")
+
+KEY = struct.Struct("<Q")
+
+# Cell index encoding a player which has not moved yet in a key.
+NOT_MOVED_CELL = 63
+
+PLIES = 4  # maximum number of moves played to reach the positions of the book
+DEPTH = 5  # search depth of the positions of the book
+
+def canonical_key(game):
+    """
+    Return the key of the canonical form of `game` (see
+    `isolation.Board.get_canonical_form`). Unlike the hash of the canonical
+    form, the key identifies the position exactly.
+
+    Returns
+    ----------
+    (int, int)
+        The key, and the index of the symmetry mapping `game` to its
+        canonical form.
+    """
+    _, symmetry = game.get_canonical_form()
+    image = symmetry_tables(game.width, game.height)[0][symmetry]
+    width = game.width
+    blank_spaces = set(game.get_blank_spaces())
+    key = 0
+    for r in range(game.height):
+        for c in range(width):
+            if (r, c) not in blank_spaces:
+                key |= 1 << image[r * width + c]
+    for player in (game.active_player, game.inactive_player):
+        location = game.get_player_location(player)
+        key = key << 6 | (image[location[0] * width + location[1]] if location is not None else NOT_MOVED_CELL)
+    return key, symmetry
+
+
+class OpeningBook:
+    """Read-only opening book, memory-mapped from a file written by
+    `write_book`.
+
+    Parameters
+    ----------
+    path : str
+        The path of the book file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.plies, self.depth, self.size = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError("{} is not an opening book.".format(path))
+        self.moves_offset = HEADER.size + KEY.size * self.size
+
+    def __len__(self):
+        return self.size
+
+    def __getstate__(self):
+        # Memory maps cannot be pickled, so the book is opened again from its
+        # path when unpickled (e.g., in the worker processes of tournament.py).
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def close(self):
+        """Unmap the book file."""
+        self.buffer.close()
+
+    def lookup(self, key):
+        """Return the cell index stored for the canonical position with the
+        given key, or None if the position is not in the book.
+        """
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self.buffer, HEADER.size + KEY.size * mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and KEY.unpack_from(self.buffer, HEADER.size + KEY.size * lo)[0] == key:
+            return self.buffer[self.moves_offset + lo]
+        return None
+
+    def probe(self, game):
+        """Return the book move for `game`, or None if `game` is not in the
+        book.
+        """
+        if (game.width, game.height) != (self.width, self.height) or game.move_count > self.plies:
+            return None
+        key, symmetry = canonical_key(game)
+        cell = self.lookup(key)
+        if cell is None:
+            return None
+        # The stored move is a move in the canonical form: map it back.
+        return game.from_canonical(divmod(cell, game.width), symmetry)
+
+
+def write_book(path, entries, width, height, plies, depth):
+    """
+    Write an opening book file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the book file.
+
+    entries : dict<int, int>
+        For each canonical position key, the cell index of its best move.
+
+    width, height, plies, depth : int
+        The size of the board, and the number of plies and search depth
+        used to build the book.
+    """
+    keys = sorted(entries)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, plies, depth, len(keys)))
+        for key in keys:
+            f.write(KEY.pack(key))
+        f.write(bytes(entries[key] for key in keys))
+
+
+def build_book(plies=PLIES, depth=DEPTH, width=7, height=7, score_fn=custom_score, player_args=None,
+               verbose=False):
+    """
+    Search every position reachable from the empty board in at most `plies`
+    moves (excluding the finished games) to the given depth.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        The maximum number of moves played to reach the positions.
+
+    depth : int (optional)
+        The search depth.
+
+    width, height : int (optional)
+        The size of the board. The keys can only hold boards of up to 52
+        cells.
+
+    score_fn : callable (optional)
+        The heuristic used by the search.
+
+    player_args : dict (optional)
+        Extra keyword arguments for the `CustomPlayer` constructor (e.g.,
+        `inplace`, `tt_size` or `ordering`).
+
+    verbose : bool (optional)
+        Flag indicating whether to print the progress of each ply.
+
+    Returns
+    ----------
+    dict<int, int>
+        For each canonical position key, the cell index of its best move, as
+        expected by `write_book`.
+    """
+    if width * height > 52:
+        raise ValueError("Opening books are limited to boards of at most 52 cells.")
+    args = dict(search_depth=depth, score_fn=score_fn, iterative=False, method='alphabeta')
+    args.update(player_args or {})
+    players = [CustomPlayer(**args), CustomPlayer(**args)]
+    for player in players:
+        player.time_left = lambda: float("inf")
+
+    entries = {}
+    positions = [Board(players[0], players[1], width, height)]
+    for ply in range(plies + 1):
+        start = timeit.default_timer()
+        next_positions = []
+        for game in positions:
+            key, symmetry = canonical_key(game)
+            if key in entries:
+                continue
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                continue
+            _, move = game.active_player.alphabeta(game, depth)
+            # The search returns (-1, -1) if it does not find a move (e.g., at depth 0).
+            if move in legal_moves:
+                row, col = game.to_canonical(move, symmetry)
+                entries[key] = row * width + col
+            if ply < plies:
+                next_positions.extend(game.forecast_move(move) for move in legal_moves)
+        if verbose:
+            print("Ply {}: {} positions, {} in the book ({:.1f}s)".format(
+                ply, len(positions), len(entries), timeit.default_timer() - start))
+        positions = next_positions
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="path of the book file to write")
+    parser.add_argument("--plies", type=int, default=PLIES,
+                        help="maximum number of moves played to reach the positions of the book")
+    parser.add_argument("--depth", type=int, default=DEPTH, help="search depth")
+    parser.add_argument("--width", type=int, default=7, help="number of columns of the board")
+    parser.add_argument("--height", type=int, default=7, help="number of rows of the board")
+    parser.add_argument("--inplace", action="store_true", help="search with Board.push/pop")
+    args = parser.parse_args()
+
+    entries = build_book(args.plies, args.depth, args.width, args.height,
+                         player_args={"inplace": args.inplace}, verbose=True)
+    write_book(args.output, entries, args.width, args.height, args.plies, args.depth)
+    print("Wrote {} positions to {}".format(len(entries), args.output))
+
+
+if __name__ == "__main__":
+    main()
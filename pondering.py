@@ -0,0 +1,201 @@
+"""This file contains the background search used by `CustomPlayer` to ponder,
+i.e. to keep searching during the turn of its opponent.
+
+After choosing its move, the player predicts the reply of its opponent and
+sends the resulting position to a worker process, which searches it until
+the player is asked for its next move. The search then stops and sends
+back its completed iterations and the entries of its transposition table:
+the entries are merged into the table of the player in any case, and if the
+opponent played the predicted reply, iterative deepening resumes after the
+last iteration completed while pondering.
+
+The search runs in a process rather than a thread, so that it neither holds
+the interpreter lock nor shares the core of the opponent, whose clock is
+measured separately by `Board.play`. The process is started with the
+player and kept for the following moves, since forking a process takes
+longer than the timer threshold of a move.
+"""
+
+import heapq
+import io
+import multiprocessing
+import pickle
+import time
+from operator import attrgetter
+
+PONDER_LIMIT = 1000  # maximum time (in milliseconds) spent pondering a position
+
+NO_JOB = 0  # number of the current job when the worker is not pondering
+SHARED_DEPTH = 3  # minimum depth of the transposition table entries sent to or by the worker
+SHARED_ENTRIES = 1024  # maximum number of transposition table entries sent to or by the worker
+MERGE_CHUNK = 128  # number of entries merged by the player between two checks of the time left
+RESULTS_WAIT = 3.  # maximum time (in milliseconds) waited for the results of the worker
+
+# Persistent ids of the players of the positions sent to the worker.
+PLAYER = "player"
+OPPONENT = "opponent"
+
+
+class JobPickler(pickle.Pickler):
+    """Pickler of the jobs sent to the worker, which refer to the pondering
+    player and its opponent by persistent ids: the worker substitutes its
+    own copy of the player, so that the positions it searches are played by
+    the player searching them, and the opponent is not copied.
+    """
+
+    def __init__(self, file, player, opponent):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.player = player
+        self.opponent = opponent
+
+    def persistent_id(self, obj):
+        if obj is self.player:
+            return PLAYER
+        if obj is self.opponent:
+            return OPPONENT
+        return None
+
+
+class JobUnpickler(pickle.Unpickler):
+    """Unpickler of the jobs received by the worker (see `JobPickler`)."""
+
+    def __init__(self, file, player, opponent):
+        super().__init__(file)
+        self.player = player
+        self.opponent = opponent
+
+    def persistent_load(self, pid):
+        return self.player if pid == PLAYER else self.opponent
+
+
+class JobStop:
+    """Stop condition of the search of a job, set once the job is no longer
+    the current job of the worker (see `search_root`).
+    """
+
+    def __init__(self, current, job):
+        self.current = current
+        self.job = job
+
+    def is_set(self):
+        return self.current.value != self.job
+
+
+def export(tt, limit=SHARED_ENTRIES):
+    """Return the `limit` deepest entries stored by the current search of
+    the transposition table `tt` to at least `SHARED_DEPTH` (see
+    `TranspositionTable.track`), deepest first, as plain tuples, which are
+    pickled much faster than `TTEntry`.
+    """
+    if tt is None or tt.tracked is None:
+        return []
+    return [tuple(entry) for entry in heapq.nlargest(limit, tt.tracked.values(), key=attrgetter('depth'))]
+
+
+def serve(player, connection, current, limit):
+    """Search the positions received through `connection` with `player`,
+    until None is received or the connection is closed.
+
+    Each job is a tuple of its number and the position to search, followed
+    by entries of the transposition table of the pondering player to merge
+    first (pickled separately, as `JobPickler` is slower). A job is
+    searched until it is no longer the `current` job or the limit (in
+    milliseconds) is reached, and its number, the completed iterations (see
+    `CustomPlayer.search_root`) and the deepest new entries of the
+    transposition table of `player` (see `export`) are sent back through
+    `connection`.
+    """
+    # The stand-in for the opponent in the positions received.
+    opponent = object()
+    while True:
+        try:
+            job = JobUnpickler(io.BytesIO(connection.recv_bytes()), player, opponent).load()
+            if job is None:
+                return
+            number, game = job
+            entries = connection.recv()
+        except EOFError:
+            return
+        if player.tt is not None:
+            player.tt.merge(entries)
+        iterations, _ = player.search_root(game, None, time.time() + limit / 1000, JobStop(current, number))
+        connection.send((number, iterations, export(player.tt)))
+
+
+class Ponderer:
+    """Search predicted positions in a background process.
+
+    Parameters
+    ----------
+    player : `game_agent.CustomPlayer`
+        The pondering player, whose state (e.g., its transposition table) is
+        copied to the process when it starts. The deep entries of its table
+        are tracked from then on, to be sent to the process with each job.
+
+    limit : float (optional)
+        The maximum time (in milliseconds) spent pondering a position, in
+        case the player is never asked for its next move (e.g., at the end
+        of a game).
+    """
+
+    def __init__(self, player, limit=PONDER_LIMIT):
+        self.player = player
+        self.job = NO_JOB
+        # The hash of the position searched by the current job, and the move
+        # of the player and predicted reply of its opponent leading to it.
+        self.key = None
+        self.moves = None
+        if player.tt is not None:
+            player.tt.track(SHARED_DEPTH)
+        self.current = multiprocessing.RawValue('l', NO_JOB)
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve, daemon=True,
+                                               args=(player, child_connection, self.current, limit))
+        self.process.start()
+        child_connection.close()
+
+    def is_alive(self):
+        """Return whether the worker process is running."""
+        return self.process.is_alive()
+
+    def start(self, game, moves, entries=()):
+        """Start searching the predicted position `game`, reached by the
+        given moves, after merging the given entries of the transposition
+        table of the player (see `export`) into the table of the search.
+        """
+        self.job += 1
+        self.current.value = self.job
+        self.key = game.get_hash()
+        self.moves = moves
+        buffer = io.BytesIO()
+        JobPickler(buffer, self.player, game.get_opponent(self.player)).dump((self.job, game))
+        self.connection.send_bytes(buffer.getvalue())
+        self.connection.send(list(entries))
+
+    def finish(self, timeout):
+        """Stop pondering and return the completed iterations and the entries
+        of the transposition table sent by the search of the current job, or
+        None if they are not received within `timeout` milliseconds (the
+        results of previous jobs received late are discarded).
+        """
+        if self.moves is None:
+            return None
+        self.current.value = NO_JOB
+        self.moves = None
+        deadline = time.time() + timeout / 1000
+        try:
+            while self.connection.poll(max(0., deadline - time.time())):
+                number, iterations, entries = self.connection.recv()
+                if number == self.job:
+                    return iterations, entries
+        except EOFError:
+            pass
+        return None
+
+    def close(self):
+        """Stop the process without waiting for its results."""
+        self.current.value = NO_JOB
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
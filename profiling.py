@@ -0,0 +1,205 @@
+"""This file contains the profiler used to see where the time of a move goes
+inside `CustomPlayer.get_move`: how many times the board operations, the
+evaluation function and the timeout checks are called and how long they
+take, how many cutoffs the search makes, and how many nodes it searches at
+each ply.
+
+The profiler costs nothing when it is not used: it instruments the board
+class and the player only for the duration of a profiled move, by replacing
+the profiled methods with timing wrappers, and restores them afterwards.
+The only permanent hook is a test at each cutoff of `CustomPlayer`.
+
+Times are inclusive (e.g., the time of `forecast_move` includes the time of
+the `copy` it makes) and include the overhead of the wrappers, so they are
+best compared with each other rather than with unprofiled runs.
+"""
+
+import json
+import timeit
+
+from collections import Counter
+from contextlib import contextmanager
+
+# Board methods counted and timed by the profiler.
+BOARD_METHODS = ('get_legal_moves', 'copy', 'forecast_move')
+
+# Player methods implementing a search, whose calls are counted per ply.
+SEARCH_METHODS = ('minimax', 'alphabeta', 'pvs')
+
+
+class TimedCall:
+    """Callable counting and timing the calls to `fn` in the given counters
+    (used for the evaluation function of a player, which unlike a closure
+    can then be pickled with the player, e.g. by a parallel search).
+    """
+
+    __slots__ = ('name', 'fn', 'counts', 'times')
+
+    def __init__(self, name, fn, counts, times):
+        self.name = name
+        self.fn = fn
+        self.counts = counts
+        self.times = times
+
+    def __call__(self, *args, **kwargs):
+        start = timeit.default_timer()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            self.times[self.name] += timeit.default_timer() - start
+            self.counts[self.name] += 1
+
+
+def timed_method(name, method, counts, times):
+    """Return a wrapper of the function `method`, to be set on a class, which
+    counts and times its calls in the given counters.
+    """
+    def wrapper(*args, **kwargs):
+        start = timeit.default_timer()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            times[name] += timeit.default_timer() - start
+            counts[name] += 1
+    return wrapper
+
+
+def counted_search(method, player, nodes):
+    """Return a wrapper of the search function `method`, to be set on the
+    class of `player`, which counts the calls made by `player` at each ply.
+    """
+    def wrapper(self, *args, **kwargs):
+        if self is player:
+            nodes[self.ply] += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def summarize(records):
+    """Return the totals of a list of move records (see `Profiler`)."""
+    counts, times = Counter(), Counter()
+    nodes_per_ply = []
+    for record in records:
+        counts.update(record['counts'])
+        times.update(record['times_ms'])
+        for ply, nodes in enumerate(record['nodes_per_ply']):
+            if ply == len(nodes_per_ply):
+                nodes_per_ply.append(0)
+            nodes_per_ply[ply] += nodes
+    return {'moves': len(records),
+            'time_ms': sum(record['time_ms'] for record in records),
+            'nodes': sum(record['nodes'] for record in records),
+            'counts': dict(counts),
+            'times_ms': dict(times),
+            'nodes_per_ply': nodes_per_ply}
+
+
+def format_summary(summary):
+    """Return a table of the operations of a summary (see `summarize`), with
+    their number of calls, total time, time per call and share of the time
+    of the moves.
+    """
+    lines = ["{} moves, {:.1f} ms, {} nodes (per ply: {})".format(
+        summary['moves'], summary['time_ms'], summary['nodes'],
+        ", ".join(str(nodes) for nodes in summary['nodes_per_ply']))]
+    lines.append("{:<16}{:>10}{:>12}{:>12}{:>8}".format("operation", "calls", "ms", "us/call", "%"))
+    for name, calls in sorted(summary['counts'].items(), key=lambda item: -summary['times_ms'].get(item[0], 0)):
+        ms = summary['times_ms'].get(name)
+        if ms is None:
+            lines.append("{:<16}{:>10}".format(name, calls))
+        else:
+            lines.append("{:<16}{:>10}{:>12.1f}{:>12.2f}{:>8.1%}".format(
+                name, calls, ms, 1000 * ms / calls, ms / summary['time_ms'] if summary['time_ms'] else 0.))
+    return "\n".join(lines)
+
+
+class Profiler:
+    """Collect a record of each profiled move, grouped by game.
+
+    A record holds the number of the move in its game (`move_count`), the
+    time of the move (`time_ms`, in milliseconds), the number of nodes
+    searched (`nodes`), the number of calls (`counts`) and the total time
+    (`times_ms`, in milliseconds) of each profiled operation, and the number
+    of calls to the search function at each ply (`nodes_per_ply`). The
+    operations are the methods of `BOARD_METHODS`, the evaluation function
+    ('score'), the timeout checks ('check_timeout') and the 'cutoffs'
+    (counted only).
+
+    A new game starts whenever a move is not later in its game than the
+    previous profiled move.
+    """
+
+    def __init__(self):
+        self.games = []
+        self.record = None
+
+    @contextmanager
+    def profile_move(self, player, game):
+        """Context manager profiling the search of `game` by `player` (a
+        `game_agent.CustomPlayer`) in its body.
+
+        The profiled methods are replaced on the classes, for the whole
+        process, so no process may be forked in the body (e.g., by a
+        parallel search or pondering): it would keep the replaced methods.
+        """
+        if not self.games or self.games[-1][-1]['move_count'] >= game.move_count:
+            self.games.append([])
+        counts, times, nodes = Counter(), Counter(), Counter()
+        self.record = {'move_count': game.move_count, 'counts': counts}
+
+        patches = []
+        for cls, names in ((type(game), BOARD_METHODS), (type(player), ('check_timeout',) + SEARCH_METHODS)):
+            for name in names:
+                method = getattr(cls, name, None)
+                if method is None:
+                    continue
+                patches.append((cls, name, cls.__dict__.get(name)))
+                if name in SEARCH_METHODS:
+                    setattr(cls, name, counted_search(method, player, nodes))
+                else:
+                    setattr(cls, name, timed_method(name, method, counts, times))
+        score = player.score
+        player.score = TimedCall('score', score, counts, times)
+
+        start_nodes = player.nodes
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            elapsed = timeit.default_timer() - start
+            player.score = score
+            for cls, name, method in reversed(patches):
+                if method is None:
+                    delattr(cls, name)
+                else:
+                    setattr(cls, name, method)
+            self.record.update(time_ms=1000 * elapsed, nodes=player.nodes - start_nodes,
+                               counts=dict(counts),
+                               times_ms={name: 1000 * seconds for name, seconds in times.items()},
+                               nodes_per_ply=[nodes[ply] for ply in range(max(nodes) + 1)] if nodes else [])
+            self.games[-1].append(self.record)
+            self.record = None
+
+    def count(self, name):
+        """Count an event (e.g., a cutoff) in the record of the current move,
+        if a move is being profiled.
+        """
+        if self.record is not None:
+            self.record['counts'][name] += 1
+
+    def moves(self):
+        """Return the records of all the profiled moves."""
+        return [record for game in self.games for record in game]
+
+    def summary(self):
+        """Return the records of the moves, the totals of each game and the
+        overall totals (see `summarize`).
+        """
+        return {'moves': self.moves(),
+                'games': [summarize(game) for game in self.games],
+                'total': summarize(self.moves())}
+
+    def save(self, path):
+        """Write the summary to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,89 @@
+"""This file contains the time manager used by `CustomPlayer` to decide
+whether to start another iteration of iterative deepening, instead of always
+searching until the timer runs out and throwing away the unfinished
+iteration.
+"""
+
+STABLE_FRACTION = 0.5  # fraction of the time of a move used when the best move is stable
+
+
+class TimeManager:
+    """Predict the cost of the next iteration of iterative deepening from
+    the effective branching factor of the previous ones, i.e. the ratio of
+    the number of nodes searched by the last two iterations (or the number
+    of legal moves of the root after the first iteration), and only start
+    it if it is expected to finish within the budget of the move.
+
+    The budget is all the time available for the move while the best move
+    keeps changing between iterations, and is shortened to a fraction of it
+    once an iteration confirms the best move of the previous one, since a
+    deeper search is then less likely to change the move played. The time
+    saved is returned to the caller (e.g., the other workers of a
+    tournament, or pondering).
+
+    Parameters
+    ----------
+    stable_fraction : float (optional)
+        The fraction of the available time used when the best move did not
+        change in the last iteration.
+    """
+
+    def __init__(self, stable_fraction=STABLE_FRACTION):
+        self.stable_fraction = stable_fraction
+        self.available = 0.
+        self.start = 0.
+        self.branching = 1
+        self.iterations = []
+
+    def new_move(self, time_left, threshold, num_legal_moves):
+        """Start managing the time of a new move.
+
+        Parameters
+        ----------
+        time_left : float
+            The time left (in milliseconds) for the move.
+
+        threshold : float
+            The time left (in milliseconds) at which the search is aborted.
+
+        num_legal_moves : int
+            The number of legal moves of the root, used as the branching
+            factor until two iterations have completed.
+        """
+        self.available = time_left - threshold
+        self.start = time_left
+        self.branching = max(num_legal_moves, 1)
+        self.iterations = []
+
+    def record_iteration(self, nodes, time_left, move):
+        """Record a completed iteration, which searched the given number of
+        nodes and found `move`, with `time_left` milliseconds left.
+        """
+        self.iterations.append((nodes, self.start - time_left, move))
+
+    def predicted_cost(self):
+        """Return the predicted time (in milliseconds) of the next iteration,
+        or 0 before the first one.
+        """
+        if not self.iterations:
+            return 0.
+        nodes, elapsed, _ = self.iterations[-1]
+        previous_nodes, previous_elapsed = 0, 0.
+        if len(self.iterations) > 1:
+            previous_nodes, previous_elapsed, _ = self.iterations[-2]
+        branching = (nodes / previous_nodes) if previous_nodes else self.branching
+        return (elapsed - previous_elapsed) * branching
+
+    def budget(self):
+        """Return the time (in milliseconds) which the search of the current
+        move may use.
+        """
+        if len(self.iterations) > 1 and self.iterations[-1][2] == self.iterations[-2][2]:
+            return self.available * self.stable_fraction
+        return self.available
+
+    def should_start(self, time_left):
+        """Return whether the next iteration is expected to finish within the
+        budget of the move, given the time left (in milliseconds).
+        """
+        return (self.start - time_left) + self.predicted_cost() <= self.budget()
@@ -19,19 +19,28 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
 import itertools
+import json
 import random
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 from isolation import Board
+from isolation import BitBoard
+from isolation import CompactBoard
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
+from game_agent import available_cores
 from game_agent import custom_score
+from mcts import MCTSPlayer
+from evaluation_cache import EvaluationCache
+from opening_book import OpeningBook
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -54,24 +63,96 @@ the performance of Iterative Deepening and the custom heuristic against the
 same opponents.
 """
 
+# Rollout policies of the MCTS agent which can be evaluated, and the heuristic
+# guiding their simulated moves.
+MCTS_ROLLOUTS = {"random": None, "improved": improved_score}
+
+# Board backends which can be selected to play the matches.
+BOARDS = {"list": Board, "bitboard": BitBoard, "compact": CompactBoard}
+
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def make_openings(num_openings, seed=None, width=7, height=7):
+    """
+    Generate a suite of random openings, i.e. pairs of initial moves for
+    player 1 and player 2, from the given seed.
+
+    Parameters
+    ----------
+    num_openings : int
+        The number of openings to generate.
+
+    seed : hashable (optional)
+        The seed of the random generator; two suites generated from the same
+        seed are identical.
+
+    width, height : int (optional)
+        The size of the board.
+
+    Returns
+    ----------
+    list<[(int, int), (int, int)]>
+        The list of openings.
+    """
+    rng = random.Random(seed)
+    openings = []
+    for _ in range(num_openings):
+        board = Board("player1", "player2", width, height)
+        opening = []
+        for _ in range(2):
+            move = rng.choice(board.get_legal_moves())
+            board.apply_move(move)
+            opening.append(move)
+        openings.append(opening)
+    return openings
+
+
+def save_openings(openings, path):
+    """ Save a suite of openings to a JSON file. """
+    with open(path, "w") as f:
+        json.dump([[list(move) for move in opening] for opening in openings], f)
+
+
+def load_openings(path):
+    """ Load a suite of openings saved by `save_openings`. """
+    with open(path) as f:
+        return [[tuple(move) for move in opening] for opening in json.load(f)]
+
+
+def derive_seed(seed, *keys):
+    """
+    Derive a seed for one match from the seed of the tournament and keys
+    identifying the match, so that each match is reproducible on its own
+    (e.g., regardless of the worker process playing it).
+    """
+    return random.Random(":".join(str(key) for key in (seed,) + keys)).getrandbits(32)
+
+
+def play_match(player1, player2, board_cls=Board, opening=None, seed=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    The games are played on boards of class `board_cls`, which must expose
+    the same API as `isolation.Board`. If `opening` is given, it is used as
+    the pair of initial moves instead of random ones. If `seed` is given,
+    the global random generator (used by e.g. `RandomPlayer`) is seeded
+    with it before playing.
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
+    games = [board_cls(player1, player2), board_cls(player2, player1)]
+
+    if seed is not None:
+        random.seed(seed)
 
-    # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+    # initialize both games with the opening, or a random move and response
+    for i in range(2):
+        move = opening[i] if opening is not None else random.choice(games[0].get_legal_moves())
         games[0].apply_move(move)
         games[1].apply_move(move)
 
@@ -102,9 +183,19 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def play_round(agents, num_matches, board_cls=Board, executor=None, openings=None, seed=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    If `executor` is a `concurrent.futures` executor (e.g., a process pool),
+    the matches are submitted to it and played concurrently; otherwise they
+    are played one after another. The results are tallied in the same order
+    in both cases, and a match which fails (e.g., because an agent raises an
+    exception) raises a RuntimeError naming the agents.
+
+    If `openings` is given, the i-th match of each pairing starts from the
+    i-th opening of the suite (cycling through the suite if needed). If
+    `seed` is given, each match is played with its own seed derived from it.
     """
     agent_1 = agents[-1]
     wins = 0.
@@ -117,15 +208,35 @@ def play_round(agents, num_matches):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
 
         # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
+        pairings = []
+        matches = []
+        for order, (p1, p2) in enumerate(itertools.permutations((agent_1.player, agent_2.player))):
+            for i in range(num_matches):
+                pairings.append((p1, p2))
+                matches.append((p1, p2, board_cls,
+                                openings[i % len(openings)] if openings else None,
+                                derive_seed(seed, idx, order, i) if seed is not None else None))
+        futures = []
+        if executor is None:
+            results = (play_match(*match) for match in matches)
+        else:
+            futures = [executor.submit(play_match, *match) for match in matches]
+            results = (future.result() for future in futures)
+
+        try:
+            for (p1, p2), (score_1, score_2) in zip(pairings, results):
                 counts[p1] += score_1
                 counts[p2] += score_2
                 total += score_1 + score_2
+        except Exception as error:
+            # Report the failed match, e.g. an agent raising an exception in a
+            # worker process, and do not play the remaining matches.
+            for future in futures:
+                future.cancel()
+            raise RuntimeError("A match between {} and {} failed.".format(*names)) from error
 
         wins += counts[agent_1.player]
 
@@ -135,14 +246,16 @@ def play_round(agents, num_matches):
     return 100. * wins / total
 
 
-def main():
+def main(board_cls=Board, method='alphabeta', workers=1, openings=None, seed=None, book=None,
+         eval_cache_size=None, mcts_rollout=None):
 
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    CUSTOM_ARGS = {"method": method, 'iterative': True, 'opening_book': book,
+                   'eval_cache_size': eval_cache_size}
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -162,21 +275,76 @@ def main():
     # faster or slower computers.
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
                    Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
+    # The MCTS agent plays with the same time limit, to compare the strength of
+    # sampling-based search to the strength of alpha-beta search per CPU-ms.
+    if mcts_rollout is not None:
+        test_agents.append(Agent(MCTSPlayer(rollout_score_fn=MCTS_ROLLOUTS[mcts_rollout]), "MCTS"))
+
+    # Play the matches in a pool of worker processes if requested. Each game
+    # still times its players with the wall clock of the process playing it, so
+    # there should not be more workers than cores.
+    executor = None
+    if workers > 1:
+        if workers > available_cores():
+            warnings.warn("More workers than cores: agents may time out due to CPU contention.")
+        executor = ProcessPoolExecutor(max_workers=workers)
 
     print(DESCRIPTION)
-    for agentUT in test_agents:
-        print("")
-        print("*************************")
-        print("{:^25}".format("Evaluating: " + agentUT.name))
-        print("*************************")
-
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
-
-        print("\n\nResults:")
-        print("----------")
-        print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+    try:
+        for agentUT in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agentUT.name))
+            print("*************************")
+
+            agents = random_agents + mm_agents + ab_agents + [agentUT]
+            win_ratio = play_round(agents, NUM_MATCHES, board_cls, executor, openings, seed)
+
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+
+            # The counters are only updated in this process if the matches
+            # are not played in worker processes.
+            cache = getattr(agentUT.player, "score", None)
+            if isinstance(cache, EvaluationCache) and cache.hit_rate is not None:
+                print("Evaluation cache: {:.1%} hits, {} evictions".format(cache.hit_rate, cache.evictions))
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--board", choices=sorted(BOARDS), default="list",
+                        help="board backend used to play the matches")
+    parser.add_argument("--method", choices=["alphabeta", "pvs"], default="alphabeta",
+                        help="search method of the ID_Improved and Student agents")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes playing matches in parallel")
+    parser.add_argument("--seed", type=int,
+                        help="seed making the openings and random players reproducible")
+    parser.add_argument("--openings",
+                        help="JSON file of openings to play from, as saved by --save-openings")
+    parser.add_argument("--save-openings",
+                        help="JSON file to save the openings generated from --seed to")
+    parser.add_argument("--eval-cache", type=int,
+                        help="capacity of the evaluation cache of the ID_Improved and Student agents")
+    parser.add_argument("--opening-book",
+                        help="opening book file of the ID_Improved and Student agents, as built by opening_book.py")
+    parser.add_argument("--mcts", choices=sorted(MCTS_ROLLOUTS),
+                        help="also evaluate a Monte Carlo tree search agent with the given rollout policy")
+    args = parser.parse_args()
+    if args.save_openings and args.openings is None and args.seed is None:
+        parser.error("--save-openings requires --seed (or --openings) to generate the openings")
+
+    openings = None
+    if args.openings:
+        openings = load_openings(args.openings)
+    elif args.seed is not None:
+        openings = make_openings(NUM_MATCHES, args.seed)
+    if openings and args.save_openings:
+        save_openings(openings, args.save_openings)
+
+    book = OpeningBook(args.opening_book) if args.opening_book else None
+    main(BOARDS[args.board], args.method, args.workers, openings, args.seed, book, args.eval_cache, args.mcts)
@@ -0,0 +1,151 @@
+"""This file contains the transposition table used by `CustomPlayer` to reuse
+the results of previous searches when the same game state is reached again,
+either through a different sequence of moves or in a later iteration of
+iterative deepening.
+"""
+
+from collections import namedtuple
+
+
+# Bound types for the scores stored in the table.
+EXACT = 0  # the score is the minimax value of the state
+LOWER = 1  # the minimax value is at least the score (the search failed high)
+UPPER = 2  # the minimax value is at most the score (the search failed low)
+
+# Key mixed into the hash of a game state when the scores are computed from the
+# point of view of player 2, so that one table can be shared by a player
+# across games in which it plays either side.
+PLAYER_2_PERSPECTIVE = 0x9e3779b97f4a7c15
+
+# Replacement strategies used when two states map to the same slot.
+REPLACEMENTS = ('always', 'depth', 'age')
+
+TTEntry = namedtuple("TTEntry", ["key", "depth", "flag", "score", "move", "age"])
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results, indexed by the Zobrist hash
+    of the game state (see `isolation.Board.get_hash`).
+
+    Each slot holds at most one entry, so the memory used by the table never
+    grows beyond `size` entries. When a new result maps to an occupied slot,
+    the replacement strategy decides which of the two entries is kept.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table.
+
+    replacement : {'always', 'depth', 'age'} (optional)
+        The replacement strategy: 'always' overwrites the stored entry;
+        'depth' keeps the entry searched to the greatest depth; 'age' behaves
+        like 'depth', but always replaces entries stored during an earlier
+        search (i.e., an earlier call to `new_search()`).
+    """
+
+    def __init__(self, size=2**16, replacement='depth'):
+        if size < 1:
+            raise ValueError("The transposition table must have at least one slot.")
+        if replacement not in REPLACEMENTS:
+            raise ValueError("Unknown replacement strategy: {!r}".format(replacement))
+        self.size = size
+        self.replacement = replacement
+        self.age = 0
+        self.slots = [None] * size
+        self.stores = 0
+        self.hits = 0
+        # The entries stored during the current search to at least
+        # `tracked_depth`, by key, if they are tracked (see `track`).
+        self.tracked_depth = None
+        self.tracked = None
+
+    def __len__(self):
+        """Return the number of occupied slots."""
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def new_search(self):
+        """Mark the start of a new search, so that entries stored so far are
+        considered old by the 'age' replacement strategy.
+        """
+        self.age += 1
+        if self.tracked is not None:
+            self.tracked.clear()
+
+    def track(self, min_depth):
+        """Record the entries stored to at least `min_depth` from now on in
+        `self.tracked`, which holds the deep entries of the current search
+        without scanning the table as `export()` does.
+        """
+        self.tracked_depth = min_depth
+        self.tracked = {}
+
+    def clear(self):
+        """Remove all the entries from the table."""
+        self.slots = [None] * self.size
+        if self.tracked is not None:
+            self.tracked.clear()
+
+    def export(self):
+        """Return the entries stored during the current search (i.e., since
+        the last call to `new_search()`), e.g. to be merged into the table
+        of another process with `merge()`.
+        """
+        return [entry for entry in self.slots if entry is not None and entry.age == self.age]
+
+    def merge(self, entries):
+        """Store entries exported by another table with `export()`,
+        following the replacement strategy. An entry never replaces a deeper
+        entry of the same game state. The entries may also be plain tuples of
+        the fields of `TTEntry`, which are faster to send to another process.
+        """
+        slots, size = self.slots, self.size
+        for key, depth, flag, score, move, _ in entries:
+            current = slots[key % size]
+            if current is not None and current.key == key and current.depth > depth:
+                continue
+            self.store(key, depth, flag, score, move)
+
+    def probe(self, key):
+        """Return the entry stored for the game state with hash `key`, or None
+        if there is no such entry.
+        """
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        """Store the result of searching the game state with hash `key` to
+        the given depth, unless the replacement strategy keeps the entry
+        already stored in the same slot.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the searched game state.
+
+        depth : int
+            The depth to which the game state was searched.
+
+        flag : {EXACT, LOWER, UPPER}
+            The type of bound given by `score`.
+
+        score : float
+            The score of the game state, from the point of view of the
+            searching player.
+
+        move : (int, int)
+            The best move found for the game state.
+        """
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None and entry.key != key:
+            if self.replacement == 'depth' and depth < entry.depth:
+                return
+            if self.replacement == 'age' and depth < entry.depth and entry.age == self.age:
+                return
+        self.slots[index] = TTEntry(key, depth, flag, score, move, self.age)
+        self.stores += 1
+        if self.tracked is not None and depth >= self.tracked_depth:
+            self.tracked[key] = self.slots[index]